@@ -1,21 +1,97 @@
+import bisect
 import csv
+import concurrent.futures
+import functools
+import gc
+import gzip
+import heapq
+import io
+import itertools
+import json
+import marshal
+import mmap
+import multiprocessing
 import os
-from os import remove
-from token import STRING
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter, deque
+from operator import itemgetter
 
 # Global BST root
 ownerRoot = None
 
+# Number of owners in the tree, kept by every operation that adds or removes
+# one (and by loading a store), so reporting it never walks the tree.
+ownerCount = 0
+
+# Generation of the live owner tree. Every node is stamped with the generation
+# it was created in ('gen'); snapshot_owners() starts a new one, which freezes
+# all existing nodes, and they are copied before any later change.
+ownerGeneration = 0
+
+# Global write-ahead journal (None unless the store was opened with one), and
+# the lock that keeps a tree mutation and its journal record together.
+ownerJournal = None
+STORE_LOCK = threading.RLock()
+
+# The snapshot open_owner_store() loaded, as (file, root, journal seq), so
+# close_owner_store() can tell that nothing changed and skip rewriting it.
+ownerStoreLoaded = None
+
+# Secondary index of (pokedex size, owner name) keys, kept in step with every
+# mutation once built. None means "not built yet": it is built on first use,
+# so loading a snapshot doesn't have to touch every owner.
+ownerRanking = None
+
+# Inverted index: species ID -> {owner key: owner name} for every owner holding
+# it. Like ownerRanking it is built on first use and None until then.
+ownerHolders = None
+
 ########################
 # 0) Read from CSV -> HOENN_DATA
 ########################
 
 
+class Species:
+    """
+    One catalog entry. Fields are slots rather than dict keys, and the evolve
+    flag is a real bool. Indexing by the old dict keys (pokemon["Name"],
+    pokemon["Can Evolve"], ...) still works for existing call sites.
+    """
+    __slots__ = ("id", "name", "type", "hp", "attack", "can_evolve")
+
+    _FIELDS = {"ID": "id", "Name": "name", "Type": "type", "HP": "hp", "Attack": "attack"}
+
+    def __init__(self, poke_id, name, poke_type, hp, attack, can_evolve):
+        self.id = poke_id
+        self.name = name
+        self.type = poke_type
+        self.hp = hp
+        self.attack = attack
+        self.can_evolve = can_evolve
+
+    def __getitem__(self, field):
+        if field == "Can Evolve":
+            return "TRUE" if self.can_evolve else "FALSE"
+        try:
+            return getattr(self, self._FIELDS[field])
+        except KeyError:
+            raise KeyError(field) from None
+
+    def __repr__(self):
+        return "Species(" + str(self.id) + ", " + repr(self.name) + ")"
+
+
 def read_hoenn_csv(filename):
     """
-    Reads 'hoenn_pokedex.csv' and returns a list of dicts:
-      [ { "ID": int, "Name": str, "Type": str, "HP": int,
-          "Attack": int, "Can Evolve": "TRUE"/"FALSE" },
+    Reads 'hoenn_pokedex.csv' and returns a list of Species records:
+      [ Species(ID: int, Name: str, Type: str, HP: int,
+                Attack: int, can_evolve: bool),
         ... ]
     """
     data_list = []
@@ -31,19 +107,275 @@ def read_hoenn_csv(filename):
             # row => [ID, Name, Type, HP, Attack, Can Evolve]
             if not row or not row[0].strip():
                 break  # Empty or invalid row => stop
-            d = {
-                "ID": int(row[0]),
-                "Name": str(row[1]),
-                "Type": str(row[2]),
-                "HP": int(row[3]),
-                "Attack": int(row[4]),
-                "Can Evolve": str(row[5]).upper()
-            }
+            d = Species(int(row[0]), str(row[1]), str(row[2]), int(row[3]), int(row[4]),
+                        str(row[5]).strip().upper() == "TRUE")
             data_list.append(d)
     return data_list
 
 
-HOENN_DATA = read_hoenn_csv("hoenn_pokedex.csv")
+class Catalog:
+    """
+    Species table built once from read_hoenn_csv, with an ID index and a
+    case-folded name index so lookups don't scan the whole list.
+
+    It also keeps one column per field, indexed directly by species ID
+    (slot 0 and any gaps are marked absent in 'present'), which the filter
+    engine evaluates predicates against, and the evolution graph:
+    'evolves_to' (0 = no evolution), 'evolves_from' (reverse edges) and
+    'final_form' (last species of each chain). 'sorted_names' and
+    'sorted_name_ids' are the case-folded names in order, for prefix search.
+
+    Predicate masks are kept as ints read from little-endian 0/1 byte rows
+    (byte i = species ID i, so to_bytes() gives back a mask indexable by ID),
+    and the filter engine combines them with one big-int AND: 'present_mask',
+    one mask per type code and the evolvable/not-evolvable pair are built
+    here, stat threshold and name prefix masks on first use (see 'mask_cache').
+    """
+    __slots__ = ("records", "by_id", "by_name", "size", "present", "type_col",
+                 "type_codes", "hp_col", "attack_col", "evolve_col",
+                 "evolves_to", "evolves_from", "final_form",
+                 "sorted_names", "sorted_name_ids", "present_mask", "type_masks",
+                 "evolve_masks", "stat_max", "mask_cache")
+
+    def __init__(self, data_list):
+        self.records = data_list
+        self.by_id = {}
+        self.by_name = {}
+        for pokemon in data_list:
+            # setdefault keeps the first row on duplicates, like the old linear scan did
+            self.by_id.setdefault(pokemon.id, pokemon)
+            self.by_name.setdefault(pokemon.name.casefold(), pokemon)
+
+        self.size = max(self.by_id, default=0) + 1
+        self.present = bytearray(self.size)
+        self.type_col = array("H", bytes(2 * self.size))
+        self.type_codes = {}
+        self.hp_col = array("H", bytes(2 * self.size))
+        self.attack_col = array("H", bytes(2 * self.size))
+        self.evolve_col = bytearray(self.size)
+        for poke_id, pokemon in self.by_id.items():
+            self.present[poke_id] = 1
+            self.type_col[poke_id] = self.type_codes.setdefault(pokemon.type.casefold(), len(self.type_codes))
+            self.hp_col[poke_id] = pokemon.hp
+            self.attack_col[poke_id] = pokemon.attack
+            self.evolve_col[poke_id] = pokemon.can_evolve
+
+        # The CSV only says whether a species can evolve; its evolution is
+        # always the next ID (chains are listed in order).
+        self.evolves_to = array("H", bytes(2 * self.size))
+        self.evolves_from = {}
+        self.final_form = array("H", bytes(2 * self.size))
+        for poke_id, pokemon in self.by_id.items():
+            if pokemon.can_evolve and poke_id + 1 in self.by_id:
+                self.evolves_to[poke_id] = poke_id + 1
+                self.evolves_from.setdefault(poke_id + 1, []).append(poke_id)
+        # IDs only grow along a chain, so walking down from the top resolves
+        # each final form from the one after it.
+        for poke_id in sorted(self.by_id, reverse=True):
+            target = self.evolves_to[poke_id]
+            self.final_form[poke_id] = self.final_form[target] if target else poke_id
+
+        ordered = sorted((name, pokemon.id) for name, pokemon in self.by_name.items())
+        self.sorted_names = [name for name, _ in ordered]
+        self.sorted_name_ids = array("H", [poke_id for _, poke_id in ordered])
+
+        self.present_mask = int.from_bytes(self.present, "little")
+        type_rows = [bytearray(self.size) for _ in self.type_codes]
+        for poke_id in self.by_id:
+            type_rows[self.type_col[poke_id]][poke_id] = 1
+        self.type_masks = [int.from_bytes(row, "little") for row in type_rows]
+        evolvable = int.from_bytes(self.evolve_col, "little")
+        self.evolve_masks = (self.present_mask & ~evolvable, evolvable)
+        self.stat_max = {"hp": max(self.hp_col, default=0), "attack": max(self.attack_col, default=0)}
+        self.mask_cache = {}
+
+    def prefix_range(self, prefix):
+        """
+        Return the (start, stop) slice of sorted_names starting with 'prefix' (already case-folded).
+        """
+        start = bisect.bisect_left(self.sorted_names, prefix)
+        stop = start
+        while stop < len(self.sorted_names) and self.sorted_names[stop].startswith(prefix):
+            stop += 1
+        return start, stop
+
+    def above_mask(self, column, threshold):
+        """
+        Mask of the species whose 'hp' or 'attack' is above 'threshold'.
+        Thresholds are clamped to the column's range, so the cache stays small.
+        """
+        values = self.hp_col if column == "hp" else self.attack_col
+        threshold = max(-1, min(threshold, self.stat_max[column]))
+        key = (column, threshold)
+        mask = self.mask_cache.get(key)
+        if mask is None:
+            mask = int.from_bytes(bytes(value > threshold for value in values), "little")
+            self.mask_cache[key] = mask
+        return mask
+
+    def prefix_mask(self, prefix):
+        """
+        Mask of the species whose name starts with 'prefix' (already case-folded).
+        """
+        start, stop = self.prefix_range(prefix)
+        key = ("prefix", start, stop)
+        mask = self.mask_cache.get(key)
+        if mask is None:
+            row = bytearray(self.size)
+            for poke_id in self.sorted_name_ids[start:stop]:
+                row[poke_id] = 1
+            mask = int.from_bytes(row, "little")
+            self.mask_cache[key] = mask
+        return mask
+
+    def __len__(self):
+        return len(self.records)
+
+    def by_poke_id(self, poke_id):
+        return self.by_id.get(poke_id)
+
+    def by_poke_name(self, name):
+        return self.by_name.get(name.casefold())
+
+
+# The catalog is loaded on first use rather than at import, so tools that only
+# need the tree helpers never read the CSV. Parsed rows are cached next to the
+# CSV as a marshal blob tagged with the CSV's mtime and size; later processes
+# load that with one read instead of re-parsing. HOENN_DATA and HOENN_CATALOG
+# are still available as module attributes (see __getattr__ below).
+CATALOG_CSV = "hoenn_pokedex.csv"
+CATALOG_CACHE_SUFFIX = ".cache"
+CATALOG_CACHE_VERSION = 1
+hoennCatalog = None
+
+
+def load_catalog(filename):
+    """
+    Return a Catalog for 'filename', from its precompiled cache when that is
+    still current, otherwise by parsing the CSV and refreshing the cache.
+    """
+    st = os.stat(filename)
+    cache_key = (CATALOG_CACHE_VERSION, st.st_mtime_ns, st.st_size)
+    cache_name = filename + CATALOG_CACHE_SUFFIX
+    try:
+        with open(cache_name, "rb") as f:
+            cached_key, rows = marshal.loads(f.read())
+        if cached_key == cache_key:
+            return Catalog([Species(*row) for row in rows])
+    except (OSError, EOFError, ValueError, TypeError):
+        pass  # missing, stale or unreadable cache => rebuild it
+
+    data_list = read_hoenn_csv(filename)
+    rows = tuple((p.id, p.name, p.type, p.hp, p.attack, p.can_evolve) for p in data_list)
+    tmp_name = cache_name + "." + str(os.getpid())
+    try:
+        with open(tmp_name, "wb") as f:
+            f.write(marshal.dumps((cache_key, rows)))
+        os.replace(tmp_name, cache_name)
+    except OSError:
+        pass  # read-only directory etc.: just run without a cache
+    return Catalog(data_list)
+
+
+def get_catalog():
+    """
+    Return the species catalog, loading it on first call.
+    """
+    global hoennCatalog
+    if hoennCatalog is None:
+        hoennCatalog = load_catalog(CATALOG_CSV)
+    return hoennCatalog
+
+
+def __getattr__(name):
+    # Lazy module attributes for code that still reads ex7.HOENN_DATA / ex7.HOENN_CATALOG.
+    if name == "HOENN_CATALOG":
+        return get_catalog()
+    if name == "HOENN_DATA":
+        return get_catalog().records
+    raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
+
+# Species IDs are stored as unsigned 16-bit ints inside each Pokedex.
+POKEDEX_TYPECODE = "H"
+
+
+class Pokedex:
+    """
+    An owner's Pokemon, stored as a compact array of species IDs in insertion
+    order, plus a membership bitset indexed by species ID. Iterating yields
+    the catalog's Species records, so it reads like the old list of dicts.
+    """
+    __slots__ = ("ids", "members")
+
+    def __init__(self, poke_ids=()):
+        self.ids = array(POKEDEX_TYPECODE, poke_ids)
+        self.members = bytearray()
+        for poke_id in self.ids:
+            self._mark(poke_id)
+
+    @classmethod
+    def frombytes(cls, data):
+        """
+        Build a Pokedex from little-endian packed species IDs.
+        """
+        pokedex = cls()
+        pokedex.ids.frombytes(data)
+        if sys.byteorder != "little":
+            pokedex.ids.byteswap()
+        for poke_id in pokedex.ids:
+            pokedex._mark(poke_id)
+        return pokedex
+
+    def copy(self):
+        pokedex = Pokedex.__new__(Pokedex)
+        pokedex.ids = array(POKEDEX_TYPECODE, self.ids)
+        pokedex.members = bytearray(self.members)
+        return pokedex
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        by_id = get_catalog().by_id
+        for poke_id in self.ids:
+            yield by_id[poke_id]
+
+    def __getitem__(self, index):
+        return get_catalog().by_id[self.ids[index]]
+
+    def __contains__(self, pokemon):
+        return self.has_id(pokemon.id)
+
+    def has_id(self, poke_id):
+        """
+        O(1) membership test by species ID.
+        """
+        byte = poke_id >> 3
+        return byte < len(self.members) and bool(self.members[byte] & (1 << (poke_id & 7)))
+
+    def _mark(self, poke_id):
+        byte = poke_id >> 3
+        if byte >= len(self.members):
+            self.members.extend(bytes(byte + 1 - len(self.members)))
+        self.members[byte] |= 1 << (poke_id & 7)
+
+    def _unmark(self, poke_id):
+        self.members[poke_id >> 3] &= ~(1 << (poke_id & 7)) & 0xFF
+
+    def append(self, pokemon):
+        self.ids.append(pokemon.id)
+        self._mark(pokemon.id)
+
+    def remove(self, pokemon):
+        if not self.has_id(pokemon.id):
+            raise ValueError("Pokedex.remove(x): x not in pokedex")
+        self.ids.remove(pokemon.id)
+        self._unmark(pokemon.id)
+
+    def pop(self, index=-1):
+        poke_id = self.ids.pop(index)
+        self._unmark(poke_id)
+        return get_catalog().by_id[poke_id]
 
 ########################
 # 1) Helper Functions
@@ -61,35 +393,35 @@ def read_int_safe(prompt):
 
 def get_poke_dict_by_id(poke_id):
     """
-    Return a copy of the Pokemon dict from HOENN_DATA by ID, or None if not found.
+    Return the Species record from HOENN_DATA by ID, or None if not found.
     """
-    for pokemon in HOENN_DATA:
-        if pokemon['ID'] == poke_id:
-            return pokemon
-    return None
+    return get_catalog().by_poke_id(poke_id)
     pass
 
 def get_poke_dict_by_name(name):
     """
-    Return a copy of the Pokemon dict from HOENN_DATA by name, or None if not found.
+    Return the Species record from HOENN_DATA by name (case-insensitive), or None if not found.
     """
-    for pokemon in HOENN_DATA:
-        if pokemon['Name'].lower() == name.lower():
-            return pokemon
-    return None
-
+    return get_catalog().by_poke_name(name)
     pass
 
-def display_pokemon_list(poke_list):
+def pokemon_list_lines(poke_list):
     """
-    Display a list of Pokemon dicts, or a message if empty.
+    Yield the display line for each Pokemon record, or a message if there are none.
     """
     flag = False
     for pokemon in poke_list:
         flag = True
-        print(f"ID: {pokemon['ID']}, Name: {pokemon['Name']}, Type: {pokemon['Type']}, HP: {pokemon['HP']}, Attack: {pokemon['Attack']}, Can Evolve: {pokemon['Can Evolve']}")
+        yield f"ID: {pokemon['ID']}, Name: {pokemon['Name']}, Type: {pokemon['Type']}, HP: {pokemon['HP']}, Attack: {pokemon['Attack']}, Can Evolve: {pokemon['Can Evolve']}"
     if not flag:
-        print("There are no Pokemons in this Pokedex that match the criteria.")
+        yield "There are no Pokemons in this Pokedex that match the criteria."
+
+def display_pokemon_list(poke_list):
+    """
+    Display a list of Pokemon records, or a message if empty.
+    """
+    for line in pokemon_list_lines(poke_list):
+        print(line)
     pass
 
 
@@ -97,154 +429,392 @@ def display_pokemon_list(poke_list):
 # 2) BST (By Owner Name)
 ########################
 
-def create_owner_node(owner_name, first_pokemon=None):
+# The owner tree is kept height-balanced (AVL), so insert/find/delete are O(log n)
+# no matter what order owners arrive in. Each node caches its case-folded name
+# under 'key' and its subtree height under 'height'.
+#
+# It is also persistent: a node whose 'gen' is older than ownerGeneration may
+# be shared with a snapshot, so the functions below never modify one in place
+# but go through writable_node(), which copies it into the live generation.
+# A change therefore copies at most the path from the root to the node it
+# touches, and only the first time after each snapshot; with no snapshot
+# outstanding, everything is updated in place as before.
+
+def new_owner_node(owner_name, poke_ids=()):
     """
-    Create and return a BST node dict with keys: 'owner', 'pokedex', 'left', 'right'.
+    Build a BST node dict with keys: 'owner', 'key', 'pokedex', 'left', 'right', 'height', 'gen'.
+    Unlike create_owner_node, this prints nothing.
     """
-    pokedex = [first_pokemon] if first_pokemon is not None else []
-    owner = {
+    return {
         "owner": owner_name,
-        "pokedex": pokedex,
+        "key": owner_name.casefold(),
+        "pokedex": Pokedex(poke_ids),
         "left": None,
         "right": None,
+        "height": 1,
+        "gen": ownerGeneration,
+    }
+
+def writable_node(node):
+    """
+    Return 'node' if it belongs to the live generation, otherwise a copy of
+    it (with its own copy of the pokedex) that does. Children stay shared.
+    Nodes loaded from a snapshot file have no 'gen' and are always copied.
+    """
+    if node is None or node.get("gen", -1) == ownerGeneration:
+        return node
+    return {
+        "owner": node["owner"],
+        "key": node["key"],
+        "pokedex": node["pokedex"].copy(),
+        "left": node["left"],
+        "right": node["right"],
+        "height": node["height"],
+        "gen": ownerGeneration,
     }
+
+def create_owner_node(owner_name, first_pokemon=None):
+    """
+    Create and return a BST node dict with keys: 'owner', 'key', 'pokedex', 'left', 'right', 'height', 'gen'.
+    """
+    owner = new_owner_node(owner_name, [first_pokemon.id] if first_pokemon is not None else [])
     print("New Pokedex created for " + owner_name + " with starter " + first_pokemon["Name"] + '.')
     return owner
     pass
 
+def node_height(node):
+    """
+    Return the height of a subtree (0 for an empty one).
+    """
+    if node is None:
+        return 0
+    return node["height"]
+
+def update_height(node):
+    """
+    Recompute a (writable) node's height from its children.
+    """
+    node["height"] = 1 + max(node_height(node["left"]), node_height(node["right"]))
+
+def rotate_left(node):
+    """
+    Rotate a subtree left around its right child. Return the new subtree root.
+    """
+    node = writable_node(node)
+    pivot = writable_node(node["right"])
+    node["right"] = pivot["left"]
+    pivot["left"] = node
+    update_height(node)
+    update_height(pivot)
+    return pivot
+
+def rotate_right(node):
+    """
+    Rotate a subtree right around its left child. Return the new subtree root.
+    """
+    node = writable_node(node)
+    pivot = writable_node(node["left"])
+    node["left"] = pivot["right"]
+    pivot["right"] = node
+    update_height(node)
+    update_height(pivot)
+    return pivot
+
+def rebalance(node):
+    """
+    Restore the AVL property at a writable 'node' after one of its subtrees changed. Return the new subtree root.
+    """
+    update_height(node)
+    balance = node_height(node["left"]) - node_height(node["right"])
+    if balance > 1:
+        if node_height(node["left"]["left"]) < node_height(node["left"]["right"]):
+            node["left"] = rotate_left(node["left"])
+        return rotate_right(node)
+    if balance < -1:
+        if node_height(node["right"]["right"]) < node_height(node["right"]["left"]):
+            node["right"] = rotate_right(node["right"])
+        return rotate_left(node)
+    return node
+
 def insert_owner_bst(root, new_node):
     """
-    Insert a new BST node by owner_name (alphabetically). Return updated root.
+    Insert a new BST node by owner_name (alphabetically, case-insensitive). Return updated root.
+    An owner that already exists is left untouched.
     """
     if root is None:
         return new_node
     if new_node is None:
         return root
-    if new_node['owner'].lower() < root['owner'].lower():
-        if root['left'] is None:
-            root['left'] = new_node
-            return root
+    if new_node["key"] < root["key"]:
+        root = writable_node(root)
         root["left"] = insert_owner_bst(root["left"], new_node)
-        return root
-    elif new_node['owner'].lower() > root['owner'].lower():
-        if root['right'] is None:
-            root['right'] = new_node
-            return root
+    elif new_node["key"] > root["key"]:
+        root = writable_node(root)
         root["right"] = insert_owner_bst(root["right"], new_node)
+    else:
         return root
+    return rebalance(root)
     pass
 
 def find_owner_bst(root, owner_name):
     """
     Locate a BST node by owner_name. Return that node or None if missing.
     """
-    if root is None:
-        return None
-    if root["owner"].lower() == owner_name.lower():
-        return root
-    left = find_owner_bst(root["left"], owner_name)
-    right = find_owner_bst(root["right"], owner_name)
-    if not left is None:
-        return left
-    elif not right is None:
-        return right
+    key = owner_name.casefold()
+    node = root
+    while node is not None:
+        if key < node["key"]:
+            node = node["left"]
+        elif key > node["key"]:
+            node = node["right"]
+        else:
+            return node
     return None
     pass
 
+def iter_owners_with_prefix(root, prefix):
+    """
+    Yield owner nodes whose names start with 'prefix' (case-insensitive), alphabetically.
+    Descends once to the first candidate and then walks in order until the
+    prefix stops matching, so it costs O(log n + matches).
+    """
+    key = prefix.casefold()
+    stack = []
+    node = root
+    while node is not None:
+        if node["key"] >= key:
+            stack.append(node)
+            node = node["left"]
+        else:
+            node = node["right"]
+    while stack:
+        node = stack.pop()
+        if not node["key"].startswith(key):
+            return
+        yield node
+        child = node["right"]
+        while child is not None:
+            stack.append(child)
+            child = child["left"]
+
 def min_node(node):
     """
     Return the leftmost node in a BST subtree.
     """
-    if node["left"] is None:
-        return node
-    else:
-        return min_node(node["left"])
+    while node["left"] is not None:
+        node = node["left"]
+    return node
     pass
 
+def pop_min_node(node):
+    """
+    Detach the leftmost node of a subtree. Return (new subtree root, detached node).
+    """
+    if node["left"] is None:
+        return node["right"], node
+    node = writable_node(node)
+    node["left"], smallest = pop_min_node(node["left"])
+    return rebalance(node), smallest
+
 def delete_owner_bst(root, owner_name):
     """
     Remove a node from the BST by owner_name. Return updated root.
     """
     if root is None:
         return root
-    temp_name = root["owner"]
-    if owner_name.lower() < temp_name.lower():
+    key = owner_name.casefold()
+    if key < root["key"]:
+        root = writable_node(root)
         root["left"] = delete_owner_bst(root["left"], owner_name)
-        return root
-    if owner_name.lower() > temp_name.lower():
+        return rebalance(root)
+    if key > root["key"]:
+        root = writable_node(root)
         root["right"] = delete_owner_bst(root["right"], owner_name)
-        return root
-    if root["left"] is None and root["right"] is None:
-        root = None
-        return root
+        return rebalance(root)
     if root["left"] is None:
-        root = root["right"]
-        return root
+        return root["right"]
     if root["right"] is None:
-        root = root["left"]
-        return root
-    successor = min_node(root["right"])
-    root["owner"] = successor["owner"]
-    root["pokedex"] = successor["pokedex"]
-    root["right"] = delete_owner_bst(root["right"], successor["owner"])
-    return root
+        return root["left"]
+    # Splice the in-order successor into this position instead of copying its
+    # data over, so every other owner keeps its own node.
+    right, successor = pop_min_node(root["right"])
+    successor = writable_node(successor)
+    successor["left"] = root["left"]
+    successor["right"] = right
+    return rebalance(successor)
     pass
 
+def build_owner_tree(nodes, lo=0, hi=None):
+    """
+    Link a list of owner nodes, already sorted by key, into a balanced tree in O(n). Return its root.
+    """
+    if hi is None:
+        hi = len(nodes)
+    if lo >= hi:
+        return None
+    mid = (lo + hi) // 2
+    node = writable_node(nodes[mid])
+    node["left"] = build_owner_tree(nodes, lo, mid)
+    node["right"] = build_owner_tree(nodes, mid + 1, hi)
+    update_height(node)
+    return node
+
+def writable_path(root, key):
+    """
+    Make every node from 'root' down to the owner with 'key' writable.
+    Return (new root, that owner's node, or None if there is no such owner).
+    """
+    root = writable_node(root)
+    node = root
+    while node is not None:
+        if key < node["key"]:
+            side = "left"
+        elif key > node["key"]:
+            side = "right"
+        else:
+            return root, node
+        child = node[side]
+        if child is not None and child.get("gen", -1) != ownerGeneration:
+            child = node[side] = writable_node(child)
+        node = child
+    return root, None
+
+def writable_owner(owner_node):
+    """
+    Return the live, writable node for this owner, path-copying it out of
+    any snapshot it is shared with. Call with STORE_LOCK held.
+    """
+    global ownerRoot
+    if owner_node.get("gen", -1) == ownerGeneration:
+        return owner_node
+    ownerRoot, node = writable_path(ownerRoot, owner_node["key"])
+    # An owner that has been deleted meanwhile gets a detached copy, so a
+    # stale reference can never change a snapshot.
+    return node if node is not None else writable_node(owner_node)
+
+def iter_writable_nodes(root):
+    """
+    Yield every node of a tree whose (writable) root is 'root', in pre-order,
+    copying each child that is shared with a snapshot into the tree first.
+    """
+    stack = [root] if root is not None else []
+    while stack:
+        node = stack.pop()
+        yield node
+        for side in ("right", "left"):
+            child = node[side]
+            if child is not None:
+                if child.get("gen", -1) != ownerGeneration:
+                    child = node[side] = writable_node(child)
+                stack.append(child)
+
 
 ########################
 # 3) BST Traversals
 ########################
 
-def bfs_traversal(root):
+# The iter_* generators walk the tree without recursion and yield nodes lazily,
+# holding at most O(height) nodes (O(width) for BFS) at a time.
+
+def iter_bfs(root):
     """
-    BFS level-order traversal. Print each owner's name and # of pokemons.
+    Yield nodes in level order (BFS).
     """
     if root is None:
         return
-    queue = [root]
+    queue = deque([root])
     while queue:
-        node = queue.pop(0)
-        print("\nOwner: " + node["owner"])
-        display_pokemon_list(node["pokedex"])
-
-        if not node["left"] is None:
+        node = queue.popleft()
+        yield node
+        if node["left"] is not None:
             queue.append(node["left"])
-        if not node["right"] is None:
+        if node["right"] is not None:
             queue.append(node["right"])
 
+def iter_pre_order(root):
+    """
+    Yield nodes in pre-order (root -> left -> right).
+    """
+    stack = [root] if root is not None else []
+    while stack:
+        node = stack.pop()
+        yield node
+        if node["right"] is not None:
+            stack.append(node["right"])
+        if node["left"] is not None:
+            stack.append(node["left"])
+
+def iter_in_order(root):
+    """
+    Yield nodes in in-order (left -> root -> right), i.e. alphabetically by owner.
+    """
+    stack = []
+    node = root
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node["left"]
+        node = stack.pop()
+        yield node
+        node = node["right"]
+
+def iter_post_order(root):
+    """
+    Yield nodes in post-order (left -> right -> root).
+    """
+    stack = []
+    node = root
+    last = None
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node["left"]
+        top = stack[-1]
+        if top["right"] is not None and top["right"] is not last:
+            node = top["right"]
+        else:
+            last = stack.pop()
+            yield last
+
+# Traversal generators by short name, for batch commands and tools.
+TRAVERSALS = {
+    "bfs": iter_bfs,
+    "pre": iter_pre_order,
+    "in": iter_in_order,
+    "post": iter_post_order,
+}
+
+def bfs_traversal(root):
+    """
+    BFS level-order traversal. Print each owner's name and # of pokemons.
+    """
+    for node in iter_bfs(root):
+        print("\nOwner: " + node["owner"])
+        display_pokemon_list(node["pokedex"])
     pass
 
 def pre_order(root):
     """
     Pre-order traversal (root -> left -> right). Print data for each node.
     """
-    if root is None:
-        return
-    pre_order_print(root)
-    pre_order(root["left"])
-    pre_order(root["right"])
+    for node in iter_pre_order(root):
+        pre_order_print(node)
     pass
 
 def in_order(root):
     """
     In-order traversal (left -> root -> right). Print data for each node.
     """
-    if root is None:
-        return
-    in_order(root["left"])
-    in_order_print(root)
-    in_order(root["right"])
+    for node in iter_in_order(root):
+        in_order_print(node)
     pass
 
 def post_order(root):
     """
     Post-order traversal (left -> right -> root). Print data for each node.
     """
-    if root is None:
-        return
-    post_order(root["left"])
-    post_order(root["right"])
-    post_order_print(root)
+    for node in iter_post_order(root):
+        post_order_print(node)
     pass
 
 
@@ -252,21 +822,149 @@ def post_order(root):
 # 4) Pokedex Operations
 ########################
 
+# The *_pokemon functions below do the work without prompting and return the
+# message to show; the *_to_owner / *_by_name functions are the menu wrappers.
+
+def add_pokemon(owner_node, poke_id):
+    """
+    Add a Pokemon by ID to this owner's pokedex if it exists and isn't a duplicate. Return the message.
+    """
+    new_pokemon = get_poke_dict_by_id(poke_id)
+    if new_pokemon is None:
+        return "ID " + str(poke_id) + " not found in Honen data."
+    if owner_node["pokedex"].has_id(poke_id):
+        return "Pokemon already in the list. No changes made."
+    with STORE_LOCK:
+        owner_node = writable_owner(owner_node)
+        owner_node["pokedex"].append(new_pokemon)
+        ranking_update(owner_node["owner"], len(owner_node["pokedex"]) - 1, len(owner_node["pokedex"]))
+        holders_update(owner_node, added=(poke_id,))
+        journal_record(JOURNAL_ADD, owner_node["owner"], poke_id)
+    return "Pokemon " + new_pokemon["Name"] + " (ID " + str(poke_id) + ") added to " + owner_node["owner"] + "'s Pokedex."
+
+def release_pokemon(owner_node, name):
+    """
+    Remove a Pokemon by name from this owner's pokedex if found. Return the message.
+    """
+    pokemon = get_poke_dict_by_name(name)
+    if pokemon is None or pokemon not in owner_node["pokedex"]:
+        return "No Pokemon named '" + name + "' in " + owner_node["owner"] + "'s Pokedex."
+    with STORE_LOCK:
+        owner_node = writable_owner(owner_node)
+        owner_node["pokedex"].remove(pokemon)
+        ranking_update(owner_node["owner"], len(owner_node["pokedex"]) + 1, len(owner_node["pokedex"]))
+        holders_update(owner_node, removed=(pokemon.id,))
+        journal_record(JOURNAL_RELEASE, owner_node["owner"], pokemon.id)
+    return "Releasing " + pokemon["Name"] + " from " + owner_node["owner"] + "."
+
+def get_evolution(pokemon):
+    """
+    Return the Species 'pokemon' evolves into, or None if it doesn't evolve.
+    """
+    catalog = get_catalog()
+    target = catalog.evolves_to[pokemon.id]
+    return catalog.by_id[target] if target else None
+
+def evolve_in_pokedex(pokedex, pokemon):
+    """
+    Replace 'pokemon' with its evolution in 'pokedex'; if the evolution is
+    already there, the new copy is released immediately.
+    Return (evolved Species, whether it was a duplicate).
+    """
+    evolved = get_evolution(pokemon)
+    is_duplicate = evolved in pokedex
+    pokedex.remove(pokemon)
+    if not is_duplicate:
+        pokedex.append(evolved)
+    return evolved, is_duplicate
+
+def evolve_pokemon(owner_node, name):
+    """
+    Evolve a Pokemon by name in this owner's pokedex. Return the message.
+    """
+    pokemon = get_poke_dict_by_name(name)
+    if pokemon is None or pokemon not in owner_node["pokedex"]:
+        return "No Pokemon named '" + name + "' in " + owner_node["owner"] + "'s Pokedex."
+    if get_evolution(pokemon) is None:
+        return "Pokemon " + pokemon["Name"] + " cannot evolve."
+    with STORE_LOCK:
+        owner_node = writable_owner(owner_node)
+        evolved, isDuplicate = evolve_in_pokedex(owner_node["pokedex"], pokemon)
+        if isDuplicate:
+            ranking_update(owner_node["owner"], len(owner_node["pokedex"]) + 1, len(owner_node["pokedex"]))
+        holders_update(owner_node, removed=(pokemon.id,), added=(evolved.id,))
+        journal_record(JOURNAL_EVOLVE, owner_node["owner"], pokemon.id)
+    message = "Pokemon evolved from " + pokemon["Name"] + " (ID " + str(pokemon["ID"]) + ") to " + evolved["Name"] + " (ID " + str(evolved["ID"]) + ")."
+    if isDuplicate:
+        message += "\n" + evolved["Name"] + " was already present; releasing it immediately."
+    return message
+
+def evolve_all_in_pokedex(pokedex):
+    """
+    Evolve every evolvable Pokemon in a pokedex by one stage, in one pass.
+    The result is the same as calling evolve on each original entry in
+    order: evolutions go to the end, and one that is already present is
+    released immediately. Return (number evolved, number released).
+    """
+    evolves_to = get_catalog().evolves_to
+    kept = array(POKEDEX_TYPECODE)
+    evolved = array(POKEDEX_TYPECODE)
+    released = 0
+    for poke_id in pokedex.ids:
+        target = evolves_to[poke_id]
+        if not target:
+            kept.append(poke_id)
+            continue
+        pokedex._unmark(poke_id)
+        if pokedex.has_id(target):
+            released += 1
+        else:
+            pokedex._mark(target)
+            evolved.append(target)
+    kept.extend(evolved)
+    pokedex.ids = kept
+    return len(evolved) + released, released
+
+def evolve_all_pokemon(owner_node):
+    """
+    Evolve everything evolvable in one owner's pokedex. Return the message.
+    """
+    with STORE_LOCK:
+        owner_node = writable_owner(owner_node)
+        old_ids = owner_node["pokedex"].ids
+        count, released = evolve_all_in_pokedex(owner_node["pokedex"])
+        ranking_update(owner_node["owner"], len(old_ids), len(owner_node["pokedex"]))
+        holders_resync(owner_node, old_ids)
+        journal_record(JOURNAL_EVOLVE_ALL, owner_node["owner"])
+    return ("Evolved " + str(count) + " Pokemon for " + owner_node["owner"]
+            + " (" + str(released) + " already present and released).")
+
+def evolve_all_owners():
+    """
+    Evolve everything evolvable across every owner in a single tree walk. Return the message.
+    """
+    global ownerRoot, ownerRanking, ownerHolders
+    count = released = owners = 0
+    with STORE_LOCK:
+        ownerRoot = writable_node(ownerRoot)
+        for node in iter_writable_nodes(ownerRoot):
+            node_count, node_released = evolve_all_in_pokedex(node["pokedex"])
+            count += node_count
+            released += node_released
+            owners += 1
+        # Most sizes may have moved; rebuilding on next use beats n re-inserts.
+        ownerRanking = None
+        ownerHolders = None
+        journal_record(JOURNAL_EVOLVE_EVERYONE, "")
+    return ("Evolved " + str(count) + " Pokemon across " + str(owners) + " owners ("
+            + str(released) + " already present and released).")
+
 def add_pokemon_to_owner(owner_node):
     """
     Prompt user for a Pokemon ID, find the data, and add to this owner's pokedex if not duplicate.
     """
     id = read_int_safe("Enter Pokemon ID to add: ")
-    if id <= 0 or id > 135:
-        print("ID " + str(id) + " not found in Honen data.")
-        return
-    for pokemon in owner_node["pokedex"]:
-        if pokemon['ID'] == id:
-            print("Pokemon already in the list. No changes made.")
-            return
-    new_pokemon = get_poke_dict_by_id(id)
-    owner_node["pokedex"].append(new_pokemon)
-    print("Pokemon " + new_pokemon["Name"] + " (ID " + str(id) + ") added to " + owner_node["owner"] + "'s Pokedex.")
+    print(add_pokemon(owner_node, id))
     pass
 
 def release_pokemon_by_name(owner_node):
@@ -274,16 +972,7 @@ def release_pokemon_by_name(owner_node):
     Prompt user for a Pokemon name, remove it from this owner's pokedex if found.
     """
     name = str(input("Enter Pokemon Name to release: ")).strip()
-    pokemon = get_poke_dict_by_name(name)
-    if pokemon is None:
-        print("No Pokemon named '" + name + "' in " + owner_node["owner"] + "'s Pokedex.")
-    else:
-        for pokemon in owner_node["pokedex"]:
-            if pokemon["Name"].lower() == name.lower():
-                owner_node["pokedex"].remove(pokemon)
-                print("Releasing " + pokemon["Name"] + " from " + owner_node["owner"] + ".")
-                return
-        print("No Pokemon named '" + name + "' in " + owner_node["owner"] + "'s Pokedex.")
+    print(release_pokemon(owner_node, name))
     pass
 
 def evolve_pokemon_by_name(owner_node):
@@ -294,28 +983,8 @@ def evolve_pokemon_by_name(owner_node):
     3) Insert new
     4) If new is a duplicate, remove it immediately
     """
-    isDuplicate = False
     name = str(input("Enter Pokemon Name to evolve: ")).strip()
-    pokemon = get_poke_dict_by_name(name)
-    if pokemon is None:
-        print("No Pokemon named '" + name + "' in " + owner_node["owner"] + "'s Pokedex.")
-        return
-    if pokemon["Can Evolve"].upper() == "FALSE":
-        print("Pokemon " + pokemon["Name"] + " cannot evolve.")
-        return
-    evolutionId = pokemon["ID"] + 1
-    evolved = get_poke_dict_by_id(evolutionId)
-    for poke in owner_node["pokedex"]:
-        if poke["Name"].lower() == evolved["Name"].lower():
-            isDuplicate = True
-            break
-    owner_node["pokedex"].remove(pokemon)
-    owner_node["pokedex"].append(evolved)
-    print("Pokemon evolved from " + pokemon["Name"] + " (ID " + str(pokemon["ID"]) + ") to " + evolved["Name"] + " (ID " + str(evolutionId) + ").")
-    if isDuplicate:
-        owner_node["pokedex"].pop()
-        print(evolved["Name"] + " was already present; releasing it immediately.")
-
+    print(evolve_pokemon(owner_node, name))
     pass
 
 
@@ -325,28 +994,200 @@ def evolve_pokemon_by_name(owner_node):
 
 def gather_all_owners(root, arr):
     """
-    Collect all BST nodes into a list (arr).
+    Collect all BST nodes into a list (arr), in pre-order.
+    """
+    arr.extend(iter_pre_order(root))
+    pass
+
+# The ranking index is a second AVL tree whose nodes are dicts with keys
+# 'key' = (pokedex size, owner name), 'left', 'right', 'height' and 'count'
+# (nodes in the subtree). The counts let it answer rank and select queries in
+# O(log n) and stream top-k / bottom-k without visiting the rest of the tree.
+
+def rank_count(node):
+    return node["count"] if node is not None else 0
+
+def rank_update(node):
+    left, right = node["left"], node["right"]
+    node["height"] = 1 + max(left["height"] if left is not None else 0,
+                             right["height"] if right is not None else 0)
+    node["count"] = 1 + rank_count(left) + rank_count(right)
+
+def rank_rotate_left(node):
+    pivot = node["right"]
+    node["right"] = pivot["left"]
+    pivot["left"] = node
+    rank_update(node)
+    rank_update(pivot)
+    return pivot
+
+def rank_rotate_right(node):
+    pivot = node["left"]
+    node["left"] = pivot["right"]
+    pivot["right"] = node
+    rank_update(node)
+    rank_update(pivot)
+    return pivot
+
+def rank_rebalance(node):
+    rank_update(node)
+    balance = node_height(node["left"]) - node_height(node["right"])
+    if balance > 1:
+        if node_height(node["left"]["left"]) < node_height(node["left"]["right"]):
+            node["left"] = rank_rotate_left(node["left"])
+        return rank_rotate_right(node)
+    if balance < -1:
+        if node_height(node["right"]["right"]) < node_height(node["right"]["left"]):
+            node["right"] = rank_rotate_right(node["right"])
+        return rank_rotate_left(node)
+    return node
+
+def rank_insert(root, key):
+    """
+    Insert a (size, name) key into the ranking tree. Return the new root.
+    """
+    if root is None:
+        return {"key": key, "left": None, "right": None, "height": 1, "count": 1}
+    if key < root["key"]:
+        root["left"] = rank_insert(root["left"], key)
+    elif key > root["key"]:
+        root["right"] = rank_insert(root["right"], key)
+    else:
+        return root
+    return rank_rebalance(root)
+
+def rank_pop_min(node):
+    if node["left"] is None:
+        return node["right"], node
+    node["left"], smallest = rank_pop_min(node["left"])
+    return rank_rebalance(node), smallest
+
+def rank_delete(root, key):
+    """
+    Remove a (size, name) key from the ranking tree. Return the new root.
     """
     if root is None:
+        return None
+    if key < root["key"]:
+        root["left"] = rank_delete(root["left"], key)
+        return rank_rebalance(root)
+    if key > root["key"]:
+        root["right"] = rank_delete(root["right"], key)
+        return rank_rebalance(root)
+    if root["left"] is None:
+        return root["right"]
+    if root["right"] is None:
+        return root["left"]
+    right, successor = rank_pop_min(root["right"])
+    successor["left"] = root["left"]
+    successor["right"] = right
+    return rank_rebalance(successor)
+
+def build_rank_tree(sorted_keys, lo=0, hi=None):
+    """
+    Build a balanced ranking tree from already-sorted keys in O(n).
+    """
+    if hi is None:
+        hi = len(sorted_keys)
+    if lo >= hi:
+        return None
+    mid = (lo + hi) // 2
+    node = {"key": sorted_keys[mid],
+            "left": build_rank_tree(sorted_keys, lo, mid),
+            "right": build_rank_tree(sorted_keys, mid + 1, hi)}
+    rank_update(node)
+    return node
+
+def ranking_index():
+    """
+    Return the ranking tree, building it from the owner tree on first use.
+    """
+    global ownerRanking
+    if ownerRanking is None and ownerRoot is not None:
+        with STORE_LOCK:
+            if ownerRanking is None:
+                keys = sorted((len(node["pokedex"]), node["owner"]) for node in iter_pre_order(ownerRoot))
+                ownerRanking = build_rank_tree(keys)
+    return ownerRanking
+
+def ranking_update(owner_name, old_size, new_size):
+    """
+    Move an owner within the ranking index after its pokedex size changed.
+    Pass old_size=None for a new owner and new_size=None for a deleted one.
+    Does nothing while the index hasn't been built. Call with STORE_LOCK held.
+    """
+    global ownerRanking
+    if ownerRanking is None or old_size == new_size:
         return
-    arr.append(root)
-    gather_all_owners(root["left"], arr)
-    gather_all_owners(root["right"], arr)
-    pass
+    if old_size is not None:
+        ownerRanking = rank_delete(ownerRanking, (old_size, owner_name))
+    if new_size is not None:
+        ownerRanking = rank_insert(ownerRanking, (new_size, owner_name))
+
+def iter_ranking(root, reverse=False):
+    """
+    Yield ranking keys in ascending order (descending with reverse=True), iteratively.
+    """
+    near, far = ("right", "left") if reverse else ("left", "right")
+    stack = []
+    node = root
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node[near]
+        node = stack.pop()
+        yield node["key"]
+        node = node[far]
+
+def owners_bottom_k(k):
+    """
+    Return the k owners with the fewest Pokemon as (size, name) pairs, fewest first.
+    """
+    return list(itertools.islice(iter_ranking(ranking_index()), k))
+
+def owners_top_k(k):
+    """
+    Return the k owners with the most Pokemon as (size, name) pairs, most first.
+    """
+    return list(itertools.islice(iter_ranking(ranking_index(), reverse=True), k))
+
+def owner_rank(owner_name):
+    """
+    Return an owner's 1-based position in the owners-by-number-of-Pokemon report, or None if missing.
+    """
+    owner = find_owner_bst(ownerRoot, owner_name)
+    if owner is None:
+        return None
+    key = (len(owner["pokedex"]), owner["owner"])
+    node = ranking_index()
+    rank = 0
+    while node is not None:
+        if key < node["key"]:
+            node = node["left"]
+        else:
+            rank += rank_count(node["left"]) + 1
+            if key == node["key"]:
+                return rank
+            node = node["right"]
+    return None
+
+def sort_report_lines():
+    """
+    Yield the lines of the owners-by-number-of-Pokemon report, streamed from the ranking index.
+    """
+    if ownerRoot is None:
+        yield "No owners at all."
+        return
+    yield "=== The Owners we have, sorted by number of Pokemons ==="
+    for size, name in iter_ranking(ranking_index()):
+        yield "Owner: " + name + " (has " + str(size) + " Pokemon)"
 
 def sort_owners_by_num_pokemon():
     """
     Gather owners, sort them by (#pokedex size, then alpha), print results.
     """
-    owner_arr = []
-    gather_all_owners(ownerRoot, owner_arr)
-    if not owner_arr:
-        print("No owners at all.")
-        return
-    owner_arr.sort(key=lambda x: (len(x["pokedex"]), x["owner"]))
-    print("=== The Owners we have, sorted by number of Pokemons ===")
-    for owner in owner_arr:
-        print("Owner: " + owner["owner"] + " (has " + str(len(owner["pokedex"])) + " Pokemon)")
+    for line in sort_report_lines():
+        print(line)
     pass
 
 
@@ -358,7 +1199,8 @@ def print_all_owners():
     """
     Let user pick BFS, Pre, In, or Post. Print each owner's data/pokedex accordingly.
     """
-    if ownerRoot is None:
+    root = snapshot_owners()
+    if root is None:
         print("No owners at all.")
         return
     print("1) BFS\n"
@@ -367,16 +1209,24 @@ def print_all_owners():
           "4) Post-Order")
     choice = read_int_safe("Your choice: ")
     if choice == 1:
-        bfs_traversal(ownerRoot)
+        bfs_traversal(root)
     if choice == 2:
-        pre_order(ownerRoot)
+        pre_order(root)
     if choice == 3:
-        in_order(ownerRoot)
+        in_order(root)
     if choice == 4:
-        post_order(ownerRoot)
+        post_order(root)
     print()
     pass
 
+def owner_report_lines(node):
+    """
+    Yield the lines printed for one owner: a blank line, the name, then the pokedex.
+    """
+    yield ""
+    yield "Owner: " + node["owner"]
+    yield from pokemon_list_lines(node["pokedex"])
+
 def pre_order_print(node):
     """
     Helper to print data in pre-order.
@@ -412,7 +1262,59 @@ def post_order_print(node):
 # 7) The Display Filter Sub-Menu
 ########################
 
-def display_filter_sub_menu(owner_node):
+# Filters are evaluated column-wise over the catalog into a species mask: a
+# bytes object with one 0/1 byte per species ID. Predicates combine by ANDing
+# masks, and applying a mask to a pokedex is a single byte lookup per entry,
+# so "Water AND HP > 60 AND evolvable" costs the same per owner as one filter.
+
+def species_mask(poke_type=None, evolvable=None, attack_above=None, hp_above=None, name_prefix=None):
+    """
+    Build a species mask for every given predicate combined with AND.
+    Predicates left as None are not applied. The per-predicate masks are
+    cached on the catalog, so this is a few big-int ANDs per call.
+    """
+    catalog = get_catalog()
+    mask = catalog.present_mask
+    if poke_type is not None:
+        code = catalog.type_codes.get(poke_type.casefold())
+        mask &= catalog.type_masks[code] if code is not None else 0
+    if evolvable is not None:
+        mask &= catalog.evolve_masks[1 if evolvable else 0]
+    if attack_above is not None:
+        mask &= catalog.above_mask("attack", attack_above)
+    if hp_above is not None:
+        mask &= catalog.above_mask("hp", hp_above)
+    if name_prefix is not None:
+        mask &= catalog.prefix_mask(name_prefix.casefold())
+    return mask.to_bytes(catalog.size, "little")
+
+def species_with_prefix(prefix):
+    """
+    Return the Species whose names start with 'prefix' (case-insensitive), in name order.
+    A binary search over the sorted names, so O(log n + matches).
+    """
+    catalog = get_catalog()
+    start, stop = catalog.prefix_range(prefix.casefold())
+    return [catalog.by_id[poke_id] for poke_id in catalog.sorted_name_ids[start:stop]]
+
+def filter_pokedex(pokedex, mask):
+    """
+    Return the Species records of a pokedex that pass a species mask, in pokedex order.
+    """
+    by_id = get_catalog().by_id
+    return [by_id[poke_id] for poke_id in pokedex.ids if mask[poke_id]]
+
+def filter_all_owners(root, mask):
+    """
+    Apply a species mask across every owner (alphabetically).
+    Yield (owner node, matching Species list) for owners with at least one match.
+    """
+    for node in iter_in_order(root):
+        matches = filter_pokedex(node["pokedex"], mask)
+        if matches:
+            yield node, matches
+
+def display_filter_sub_menu(owner_node):
     """
     1) Only type X
     2) Only evolvable
@@ -435,18 +1337,18 @@ def display_filter_sub_menu(owner_node):
     while choice != 7:
         if choice == 1:
             type = str(input("Which Type? (e.g. GRASS, WATER): ")).strip()
-            display_pokemon_list([pokemon for pokemon in owner_node["pokedex"] if pokemon["Type"].lower() == type.lower()])
+            display_pokemon_list(filter_pokedex(owner_node["pokedex"], species_mask(poke_type=type)))
         if choice == 2:
-            display_pokemon_list([pokemon for pokemon in owner_node["pokedex"] if pokemon["Can Evolve"].upper() == "TRUE"])
+            display_pokemon_list(filter_pokedex(owner_node["pokedex"], species_mask(evolvable=True)))
         if choice == 3:
             attack = read_int_safe("Enter Attack threshold: ")
-            display_pokemon_list([pokemon for pokemon in owner_node["pokedex"] if pokemon["Attack"] > attack])
+            display_pokemon_list(filter_pokedex(owner_node["pokedex"], species_mask(attack_above=attack)))
         if choice == 4:
             hp = read_int_safe("Enter HP threshold: ")
-            display_pokemon_list([pokemon for pokemon in owner_node["pokedex"] if pokemon["HP"] > hp])
+            display_pokemon_list(filter_pokedex(owner_node["pokedex"], species_mask(hp_above=hp)))
         if choice == 5:
             letters = str(input("Starting letter(s): ")).strip()
-            display_pokemon_list([pokemon for pokemon in owner_node["pokedex"] if pokemon["Name"].lower()[:len(letters)] == letters.lower()[:len(letters)]])
+            display_pokemon_list(filter_pokedex(owner_node["pokedex"], species_mask(name_prefix=letters)))
         if choice == 6:
             display_pokemon_list(owner_node["pokedex"])
 
@@ -491,6 +1393,9 @@ def existing_pokedex():
         "5. Back to Main\n")
     choice = read_int_safe("Your choice: ")
     while choice != 5:
+        # Changes may replace the node with a copy (see writable_node), so
+        # look the owner up again every time round.
+        owner = find_owner_bst(ownerRoot, name)
         if choice == 1:
             add_pokemon_to_owner(owner)
         if choice == 2:
@@ -511,6 +1416,41 @@ def existing_pokedex():
     print("Back to Main Menu.")
     pass
 
+def create_owner(name, starter_id):
+    """
+    Create a new owner with a starter Pokemon and insert it into the tree. Return the message.
+    """
+    global ownerRoot, ownerCount
+    if find_owner_bst(ownerRoot, name):
+        return "Owner '" + name + "' already exists. No new Pokedex created."
+    starter = get_poke_dict_by_id(starter_id)
+    if starter is None:
+        return "ID " + str(starter_id) + " not found in Honen data."
+    with STORE_LOCK:
+        owner = new_owner_node(name, [starter_id])
+        ownerRoot = insert_owner_bst(ownerRoot, owner)
+        ownerCount += 1
+        ranking_update(name, None, 1)
+        holders_update(owner, added=(starter_id,))
+        journal_record(JOURNAL_CREATE, name, starter_id)
+    return "New Pokedex created for " + name + " with starter " + starter["Name"] + "."
+
+def delete_owner(name):
+    """
+    Delete an owner and their whole pokedex from the tree. Return the message.
+    """
+    global ownerRoot, ownerCount
+    owner = find_owner_bst(ownerRoot, name)
+    if owner is None:
+        return "Owner '" + name + "' not found."
+    with STORE_LOCK:
+        ranking_update(owner["owner"], len(owner["pokedex"]), None)
+        holders_update(owner, removed=owner["pokedex"].ids)
+        ownerRoot = delete_owner_bst(ownerRoot, name)
+        ownerCount -= 1
+        journal_record(JOURNAL_DELETE, name)
+    return "Deleting " + name + "'s entire Pokedex...\nPokedex deleted."
+
 def main_menu():
     """
     Main menu for:
@@ -520,6 +1460,7 @@ def main_menu():
     4) Sort owners
     5) Print all
     6) Exit
+    7) Store statistics
     """
     print("=== Main Menu ===\n"
         "1. New Pokedex\n"
@@ -527,11 +1468,22 @@ def main_menu():
         "3. Delete a Pokedex\n"
         "4. Display owners by number of Pokemon\n"
         "5. Print All\n"
-        "6. Exit")
+        "6. Exit\n"
+        "7. Store statistics")
     pass
 
-def main():
+def main(snapshot_file=None, journal_file=None, import_file=None):
+    """
+    Run the interactive menu. If snapshot_file is given, owners are loaded
+    from it on start (when it exists) and saved back to it on exit. With a
+    journal_file too, every change is also logged as it happens and replayed
+    after a crash. An import_file is bulk-loaded before the menu starts.
+    """
     global ownerRoot
+    if snapshot_file is not None:
+        open_owner_store(snapshot_file, journal_file)
+    if import_file is not None:
+        print(import_owners(import_file))
     main_menu()
     choice = read_int_safe("Your choice: ")
     while (choice != 6):
@@ -549,29 +1501,1552 @@ def main():
                     starter = 4
                 elif starter == 3:
                     starter = 7
-                starter = get_poke_dict_by_id(starter)
-                owner = create_owner_node(name, starter)
-                ownerRoot = insert_owner_bst(ownerRoot, owner)
+                print(create_owner(name, starter))
         if choice == 2:
             existing_pokedex()
         if choice == 3:
             name = str(input("Enter owner to delete: ")).strip()
-            if find_owner_bst(ownerRoot, name) is None:
-                print("Owner '" + name + "' not found.")
-            else:
-                ownerRoot = delete_owner_bst(ownerRoot, name)
-                print("Deleting " + name + "'s entire Pokedex...")
-                print("Pokedex deleted.")
+            print(delete_owner(name))
         if choice == 4:
             sort_owners_by_num_pokemon()
         if choice == 5:
             print_all_owners()
-        if choice > 6 or choice <= 0:
+        if choice == 7:
+            for line in stats_report_lines(stats_snapshot()):
+                print(line)
+        if choice > 7 or choice <= 0:
             print("Invalid choice. Please try again.")
         main_menu()
         choice = read_int_safe("Your choice: ")
+    if snapshot_file is not None:
+        close_owner_store(snapshot_file)
     print("Goodbye!")
     pass
 
+
+########################
+# 9) Snapshots (binary save/load)
+########################
+
+# Snapshot layout (all little-endian):
+#   header      SNAPSHOT_HEADER: magic, version, node count, root index,
+#               the offsets of the three sections below, and the sequence
+#               number of the last journal record folded into it
+#   node table  one SNAPSHOT_NODE record per owner: name offset/length into
+#               the string table, left/right child index (-1 for none),
+#               pokedex offset/length (in IDs) into the ID section, height
+#   strings     owner names, UTF-8, concatenated
+#   ids         every pokedex's species IDs as uint16, concatenated
+# Nodes are written in pre-order, so the root is always index 0.
+
+SNAPSHOT_MAGIC = b"PKDX"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_HEADER = struct.Struct("<4sHHIiQQQQ")
+SNAPSHOT_NODE = struct.Struct("<IIiiIIH")
+
+
+def save_owner_snapshot(root, filename, journal_seq=0):
+    """
+    Write the whole owner tree to 'filename' in the binary snapshot format.
+    The file is written next to the target and renamed over it, so a crash
+    mid-save never leaves a torn snapshot.
+    """
+    nodes = list(iter_pre_order(root))
+    index_of = {id(node): i for i, node in enumerate(nodes)}
+    names = [node["owner"].encode("utf-8") for node in nodes]
+
+    node_table_offset = SNAPSHOT_HEADER.size
+    strings_offset = node_table_offset + SNAPSHOT_NODE.size * len(nodes)
+    ids_offset = strings_offset + sum(len(name) for name in names)
+
+    tmp_name = filename + ".tmp"
+    with open(tmp_name, "wb") as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(nodes),
+                                     0 if nodes else -1,
+                                     node_table_offset, strings_offset, ids_offset, journal_seq))
+        name_pos = 0
+        dex_pos = 0
+        for node, name in zip(nodes, names):
+            left = index_of[id(node["left"])] if node["left"] is not None else -1
+            right = index_of[id(node["right"])] if node["right"] is not None else -1
+            dex_len = len(node["pokedex"])
+            f.write(SNAPSHOT_NODE.pack(name_pos, len(name), left, right, dex_pos, dex_len, node["height"]))
+            name_pos += len(name)
+            dex_pos += dex_len
+        for name in names:
+            f.write(name)
+        for node in nodes:
+            ids = node["pokedex"].ids
+            if sys.byteorder != "little":
+                ids = array(POKEDEX_TYPECODE, ids)
+                ids.byteswap()
+            ids.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_name, filename)
+    pass
+
+
+class SnapshotReader:
+    """
+    Memory-mapped view of a snapshot file. Nothing is decoded up front:
+    node(i) builds a LazyOwnerNode that reads its own record on demand.
+    """
+
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, self.node_count, self.root_index,
+         self.node_table_offset, self.strings_offset, self.ids_offset,
+         self.journal_seq) = SNAPSHOT_HEADER.unpack_from(self.buf, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(filename + " is not a version " + str(SNAPSHOT_VERSION) + " owner snapshot")
+
+    def record(self, index):
+        return SNAPSHOT_NODE.unpack_from(self.buf, self.node_table_offset + index * SNAPSHOT_NODE.size)
+
+    def node(self, index):
+        if index < 0:
+            return None
+        return LazyOwnerNode(self, index)
+
+
+class LazyOwnerNode(dict):
+    """
+    An owner node backed by a snapshot. 'owner', 'key' and 'height' are
+    filled in when the node is created; 'left', 'right' and 'pokedex' are
+    decoded the first time they are read and then stored like any other
+    key, so a lookup only materializes the path it walks.
+    """
+    __slots__ = ("_reader", "_index")
+
+    def __init__(self, reader, index):
+        name_off, name_len, _, _, _, _, height = reader.record(index)
+        start = reader.strings_offset + name_off
+        owner_name = reader.buf[start:start + name_len].decode("utf-8")
+        super().__init__(owner=owner_name, key=owner_name.casefold(), height=height)
+        self._reader = reader
+        self._index = index
+
+    def __missing__(self, field):
+        _, _, left, right, dex_off, dex_len, _ = self._reader.record(self._index)
+        if field == "left":
+            value = self._reader.node(left)
+        elif field == "right":
+            value = self._reader.node(right)
+        elif field == "pokedex":
+            start = self._reader.ids_offset + 2 * dex_off
+            value = Pokedex.frombytes(self._reader.buf[start:start + 2 * dex_len])
+        else:
+            raise KeyError(field)
+        self[field] = value
+        return value
+
+
+def load_owner_snapshot(filename):
+    """
+    Open a snapshot and return its root node (or None for an empty store).
+    Owners are materialized lazily as lookups and traversals reach them.
+    """
+    reader = SnapshotReader(filename)
+    return reader.node(reader.root_index)
+
+
+########################
+# 10) Journal (write-ahead log)
+########################
+
+# The journal file starts with JOURNAL_HEADER (magic + the sequence number of
+# the record just before its first one), followed by records of
+# JOURNAL_RECORD (op, species ID, owner-name length, CRC32) + the UTF-8 name.
+# Records are numbered implicitly from the header's base, and a snapshot
+# stores the last number it contains, so replay after a crash skips whatever
+# a compaction already folded in. A torn or corrupt tail record ends replay,
+# and the file is cut back to the last intact record before logging resumes,
+# so new records never land behind the bad bytes.
+
+JOURNAL_MAGIC = b"PKJL"
+JOURNAL_HEADER = struct.Struct("<4sQ")
+JOURNAL_RECORD = struct.Struct("<BHHI")
+
+JOURNAL_CREATE = 1   # species ID = starter
+JOURNAL_DELETE = 2
+JOURNAL_ADD = 3
+JOURNAL_RELEASE = 4
+JOURNAL_EVOLVE = 5   # species ID = the Pokemon that evolved
+JOURNAL_EVOLVE_ALL = 6
+JOURNAL_EVOLVE_EVERYONE = 7   # no owner: every owner in the store
+
+
+def journal_record(op, owner_name, poke_id=0):
+    """
+    Log one mutation to the open journal, if there is one.
+    """
+    if ownerJournal is not None:
+        ownerJournal.append(op, owner_name, poke_id)
+
+
+def apply_journal_record(root, op, owner_name, poke_id):
+    """
+    Re-apply one journal record to the tree without printing. Return the updated root.
+    """
+    if op == JOURNAL_CREATE:
+        return insert_owner_bst(root, new_owner_node(owner_name, [poke_id]))
+    if op == JOURNAL_DELETE:
+        return delete_owner_bst(root, owner_name)
+    if op == JOURNAL_EVOLVE_EVERYONE:
+        root = writable_node(root)
+        for node in iter_writable_nodes(root):
+            evolve_all_in_pokedex(node["pokedex"])
+        return root
+    root, node = writable_path(root, owner_name.casefold())
+    if op == JOURNAL_EVOLVE_ALL:
+        if node is not None:
+            evolve_all_in_pokedex(node["pokedex"])
+        return root
+    pokemon = get_poke_dict_by_id(poke_id)
+    if node is None or pokemon is None:
+        return root
+    pokedex = node["pokedex"]
+    if op == JOURNAL_ADD and pokemon not in pokedex:
+        pokedex.append(pokemon)
+    elif op == JOURNAL_RELEASE and pokemon in pokedex:
+        pokedex.remove(pokemon)
+    elif op == JOURNAL_EVOLVE and pokemon in pokedex and get_evolution(pokemon) is not None:
+        evolve_in_pokedex(pokedex, pokemon)
+    return root
+
+
+class OwnerJournal:
+    """
+    Append-only mutation log with group commit and background compaction.
+
+    append() only packs the record into an in-memory buffer. The buffer is
+    written and fsynced once per batch: when 'batch_size' records are
+    pending, or when the background thread wakes every 'flush_interval'
+    seconds. A burst of operations therefore shares one fsync. The same
+    thread folds the log into a fresh snapshot once it grows past
+    'compact_bytes'.
+    """
+
+    def __init__(self, filename, snapshot_file, base_seq, batch_size=512,
+                 flush_interval=0.05, compact_bytes=4 * 1024 * 1024):
+        self.filename = filename
+        self.snapshot_file = snapshot_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_bytes = compact_bytes
+        self.pending = bytearray()
+        self.pending_count = 0
+        self.seq = base_seq
+        self.lock = threading.Lock()
+        self.compact_lock = threading.Lock()
+        if os.path.exists(filename) and os.path.getsize(filename) >= JOURNAL_HEADER.size:
+            self.f = open(filename, "ab")
+        else:
+            self.f = open(filename, "wb")
+            self.f.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, base_seq))
+            self.f.flush()
+            os.fsync(self.f.fileno())
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._background, name="owner-journal", daemon=True)
+        self._thread.start()
+
+    def append(self, op, owner_name, poke_id=0):
+        name = owner_name.encode("utf-8")
+        body = struct.pack("<BHH", op, poke_id, len(name)) + name
+        with self.lock:
+            self.pending += JOURNAL_RECORD.pack(op, poke_id, len(name), zlib.crc32(body))
+            self.pending += name
+            self.pending_count += 1
+            self.seq += 1
+            if self.pending_count >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        """
+        Write and fsync every pending record.
+        """
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self.pending:
+            return
+        self.f.write(self.pending)
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.pending.clear()
+        self.pending_count = 0
+
+    def compact(self):
+        """
+        Fold the log into a new snapshot and drop the records it covers.
+        The tree is frozen with snapshot_owners() under STORE_LOCK, together
+        with the number of the last record it includes; the O(n) save then
+        runs without the lock while writers carry on logging. Finally the
+        records appended meanwhile are carried over into a fresh log.
+        """
+        with self.compact_lock:
+            with STORE_LOCK:
+                with self.lock:
+                    self._flush_locked()
+                    root = snapshot_owners()
+                    seq = self.seq
+                    covered = os.fstat(self.f.fileno()).st_size
+            # A crash from here on leaves either the old snapshot or the new
+            # one next to the full log; replay skips what the snapshot holds.
+            save_owner_snapshot(root, self.snapshot_file, seq)
+            with self.lock:
+                self._flush_locked()
+                self.f.close()
+                with open(self.filename, "rb") as f:
+                    f.seek(covered)
+                    tail = f.read()
+                tmp_name = self.filename + ".tmp"
+                with open(tmp_name, "wb") as f:
+                    f.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, seq))
+                    f.write(tail)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_name, self.filename)
+                self.f = open(self.filename, "ab")
+
+    def _background(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            if self.f.tell() > self.compact_bytes:
+                self.compact()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        self.f.close()
+
+
+def replay_journal(root, filename, after_seq, owners=0):
+    """
+    Apply every intact record in a journal file numbered after 'after_seq'
+    to a tree of 'owners' owners. Return (updated root, number of the last
+    intact record, byte offset just past it, owners now in the tree).
+    Anything from that offset on is torn or corrupt.
+    """
+    with open(filename, "rb") as f:
+        data = f.read()
+    if len(data) < JOURNAL_HEADER.size:
+        return root, after_seq, 0, owners
+    magic, seq = JOURNAL_HEADER.unpack_from(data, 0)
+    if magic != JOURNAL_MAGIC:
+        raise ValueError(filename + " is not an owner journal")
+    pos = JOURNAL_HEADER.size
+    while pos + JOURNAL_RECORD.size <= len(data):
+        op, poke_id, name_len, crc = JOURNAL_RECORD.unpack_from(data, pos)
+        name_start = pos + JOURNAL_RECORD.size
+        name = data[name_start:name_start + name_len]
+        if len(name) < name_len or zlib.crc32(struct.pack("<BHH", op, poke_id, name_len) + name) != crc:
+            break
+        seq += 1
+        if seq > after_seq:
+            owner_name = name.decode("utf-8")
+            if op == JOURNAL_CREATE or op == JOURNAL_DELETE:
+                exists = find_owner_bst(root, owner_name) is not None
+                if op == JOURNAL_CREATE and not exists:
+                    owners += 1
+                elif op == JOURNAL_DELETE and exists:
+                    owners -= 1
+            root = apply_journal_record(root, op, owner_name, poke_id)
+        pos = name_start + name_len
+    return root, max(seq, after_seq), pos, owners
+
+
+def truncate_journal(filename, offset):
+    """
+    Cut a journal file back to 'offset' bytes (the end of its last intact record) and fsync it.
+    """
+    with open(filename, "r+b") as f:
+        f.truncate(offset)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def open_owner_store(snapshot_file, journal_file=None):
+    """
+    Load ownerRoot from snapshot_file (if it exists). With a journal_file,
+    replay it on top of the snapshot and keep it open for new mutations.
+    """
+    global ownerRoot, ownerCount, ownerJournal, ownerRanking, ownerHolders, ownerStoreLoaded
+    seq = 0
+    ownerRoot = None
+    ownerCount = 0
+    ownerRanking = None
+    ownerHolders = None
+    ownerStoreLoaded = None
+    if os.path.exists(snapshot_file):
+        reader = SnapshotReader(snapshot_file)
+        ownerRoot = reader.node(reader.root_index)
+        ownerCount = reader.node_count
+        seq = reader.journal_seq
+        ownerStoreLoaded = (snapshot_file, ownerRoot, seq)
+    if journal_file is not None:
+        if os.path.exists(journal_file):
+            ownerRoot, seq, good_bytes, ownerCount = replay_journal(ownerRoot, journal_file, seq, ownerCount)
+            if good_bytes < os.path.getsize(journal_file):
+                truncate_journal(journal_file, good_bytes)
+        ownerJournal = OwnerJournal(journal_file, snapshot_file, seq)
+    pass
+
+
+def close_owner_store(snapshot_file):
+    """
+    Persist ownerRoot to snapshot_file, folding in and closing the journal if one is open.
+    A store that is still exactly the snapshot it was loaded from isn't rewritten:
+    saving would decode every lazily loaded node just to write the same file.
+    """
+    global ownerJournal, ownerStoreLoaded
+    loaded, ownerStoreLoaded = ownerStoreLoaded, None
+    # Loaded nodes are always copied before a change (see writable_node), so
+    # an untouched tree still has the very root object that was loaded.
+    untouched = (loaded is not None and loaded[0] == snapshot_file and loaded[1] is ownerRoot
+                 and (ownerJournal is None or ownerJournal.seq == loaded[2]))
+    if ownerJournal is not None:
+        if not untouched:
+            ownerJournal.compact()
+        ownerJournal.close()
+        ownerJournal = None
+    elif not untouched:
+        save_owner_snapshot(ownerRoot, snapshot_file)
+    pass
+
+
+########################
+# 11) Analytics
+########################
+
+# Whole-store statistics. The tree is cut by key range: the parent expands
+# only the top few levels of the tree into disjoint subtrees (each one a
+# contiguous range of owner names) and hands every worker process the path
+# to its subtree. The frozen snapshot root reaches the forked workers as
+# their initializer argument (inherited, not pickled), so each one walks its
+# own range over the inherited tree; no owners, IDs or node objects cross the process boundary,
+# only a per-species histogram comes back. Every statistic is then derived
+# from the merged histogram and the catalog columns, so merging costs
+# O(catalog size) no matter how big the store is.
+
+ANALYTICS_PARALLEL_HEIGHT = 18  # smaller trees are counted in this process
+ANALYTICS_RANGES_PER_WORKER = 4
+ANALYTICS_BATCH = 1 << 16
+
+# Root being counted, set in each worker process by analytics_init only.
+analyticsRoot = None
+
+
+def analytics_split(root, ranges):
+    """
+    Expand the top levels of the tree until there are at least 'ranges'
+    subtrees (or only leaves are left). Return (paths, top nodes): each path
+    is a string of "L"/"R" steps from the root to one subtree, and the top
+    nodes are the few nodes above those subtrees.
+    """
+    frontier = [("", root)] if root is not None else []
+    top = []
+    while 0 < len(frontier) < ranges:
+        expanded = []
+        for path, node in frontier:
+            top.append(node)
+            if node["left"] is not None:
+                expanded.append((path + "L", node["left"]))
+            if node["right"] is not None:
+                expanded.append((path + "R", node["right"]))
+        frontier = expanded
+    return [path for path, _ in frontier], top
+
+
+def analytics_count_nodes(nodes, catalog_size):
+    """
+    Return (per-species histogram, owner count) over an iterable of owner nodes.
+    """
+    counts = Counter()
+    batch = array(POKEDEX_TYPECODE)
+    owners = 0
+    for node in nodes:
+        batch.extend(node["pokedex"].ids)
+        owners += 1
+        if len(batch) >= ANALYTICS_BATCH:
+            counts.update(batch)
+            del batch[:]
+    counts.update(batch)
+    histogram = [0] * catalog_size
+    for poke_id, count in counts.items():
+        histogram[poke_id] = count
+    return histogram, owners
+
+
+def analytics_init(root):
+    """
+    Worker initializer: remember the root this pool counts.
+    """
+    global analyticsRoot
+    analyticsRoot = root
+
+
+def analytics_count_range(path, catalog_size):
+    """
+    Worker: count the subtree of analyticsRoot reached by 'path'.
+    """
+    node = analyticsRoot
+    for step in path:
+        node = node["left"] if step == "L" else node["right"]
+    return analytics_count_nodes(iter_pre_order(node), catalog_size)
+
+
+def analytics_workers(root, workers):
+    """
+    Number of worker processes to use for 'root' (1 means count in this
+    process). Never more than the CPU count, whatever the caller asked for.
+    """
+    cpus = os.cpu_count() or 1
+    workers = cpus if workers is None else min(workers, cpus)
+    if workers <= 1 or root is None or root["height"] < ANALYTICS_PARALLEL_HEIGHT:
+        return 1
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return 1
+    return workers
+
+
+def owner_analytics(root, workers=None):
+    """
+    Aggregate statistics over every owner's pokedex. 'root' must not change
+    while it is counted (pass a snapshot_owners() root). Small trees, a
+    single CPU or workers=1 count everything in this process; otherwise the
+    key ranges go to a pool of up to 'workers' forked processes (at most the
+    CPU count, which is also the default).
+    Return a dict of owners, pokemon, types, hp/attack mean and max,
+    evolvable ratio and the most commonly owned species.
+    """
+    catalog = get_catalog()
+    workers = analytics_workers(root, workers)
+    paths = top = None
+    if workers > 1:
+        paths, top = analytics_split(root, workers * ANALYTICS_RANGES_PER_WORKER)
+        workers = min(workers, len(paths))
+    if workers <= 1:
+        histogram, owners = analytics_count_nodes(iter_pre_order(root), catalog.size)
+    else:
+        histogram, owners = analytics_count_nodes(top, catalog.size)
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                initializer=analytics_init, initargs=(root,)) as pool:
+            futures = [pool.submit(analytics_count_range, path, catalog.size) for path in paths]
+            for future in concurrent.futures.as_completed(futures):
+                partial, range_owners = future.result()
+                owners += range_owners
+                for poke_id, count in enumerate(partial):
+                    if count:
+                        histogram[poke_id] += count
+
+    total = sum(histogram)
+    types = {}
+    hp_sum = attack_sum = evolvable = 0
+    hp_max = attack_max = 0
+    most_common = None
+    for poke_id, count in enumerate(histogram):
+        if not count:
+            continue
+        pokemon = catalog.by_id[poke_id]
+        types[pokemon.type] = types.get(pokemon.type, 0) + count
+        hp_sum += pokemon.hp * count
+        attack_sum += pokemon.attack * count
+        hp_max = max(hp_max, pokemon.hp)
+        attack_max = max(attack_max, pokemon.attack)
+        if pokemon.can_evolve:
+            evolvable += count
+        if most_common is None or count > most_common[1]:
+            most_common = (pokemon.name, count)
+    return {
+        "owners": owners,
+        "pokemon": total,
+        "types": dict(sorted(types.items(), key=lambda item: (-item[1], item[0]))),
+        "hp_mean": hp_sum / total if total else 0.0,
+        "hp_max": hp_max,
+        "attack_mean": attack_sum / total if total else 0.0,
+        "attack_max": attack_max,
+        "evolvable_ratio": evolvable / total if total else 0.0,
+        "most_common": most_common,
+    }
+
+
+def analytics_report_lines(stats):
+    """
+    Yield a readable report of owner_analytics() results.
+    """
+    yield "=== Pokedex analytics ==="
+    yield "Owners: " + str(stats["owners"]) + ", Pokemon: " + str(stats["pokemon"])
+    if not stats["pokemon"]:
+        return
+    yield "HP: mean " + format(stats["hp_mean"], ".1f") + ", max " + str(stats["hp_max"])
+    yield "Attack: mean " + format(stats["attack_mean"], ".1f") + ", max " + str(stats["attack_max"])
+    yield "Evolvable: " + format(100 * stats["evolvable_ratio"], ".1f") + "%"
+    yield "Most owned: " + stats["most_common"][0] + " (" + str(stats["most_common"][1]) + ")"
+    for poke_type, count in stats["types"].items():
+        yield "  " + poke_type + ": " + str(count)
+
+
+########################
+# 12) Batch Mode
+########################
+
+# One command per line; blank lines and lines starting with '#' are skipped.
+# The owner name is always the last argument and may contain spaces.
+#   create <starter-id> <owner>
+#   delete <owner>
+#   add <species-id> <owner>
+#   release <species-id-or-name> <owner>
+#   evolve <species-id-or-name> <owner>
+#   evolve-all [<owner>]                    every owner when none is given
+#   show <owner>
+#   owners <prefix>                         owner names starting with prefix
+#   species <prefix>                        species names starting with prefix
+#   sort
+#   top <k> / bottom <k>                    owners with the most / fewest Pokemon
+#   rank <owner>                            position in the sort report
+#   print [bfs|pre|in|post]                 (default: bfs)
+#   filter <predicate>...                   type=X evolvable attack>N hp>N prefix=X
+#   analytics [workers]                     whole-store statistics
+#   stats                                   instrumentation counters (see --stats)
+#   import <file>                           bulk-load owners from CSV / JSON Lines
+#   holders <species-id-or-name>            owners holding that species
+#   holding <predicate>...                  owners holding any species matching filter predicates
+#   export [bfs|pre|in|post] <file>         write every owner to .csv/.jsonl/.bin[.gz] (default: in)
+
+BATCH_USAGE = {
+    "create": "create <starter-id> <owner>",
+    "delete": "delete <owner>",
+    "add": "add <species-id> <owner>",
+    "release": "release <species-id-or-name> <owner>",
+    "evolve": "evolve <species-id-or-name> <owner>",
+    "evolve-all": "evolve-all [<owner>]",
+    "show": "show <owner>",
+    "owners": "owners <prefix>",
+    "species": "species <prefix>",
+    "sort": "sort",
+    "top": "top <k>",
+    "bottom": "bottom <k>",
+    "rank": "rank <owner>",
+    "print": "print [bfs|pre|in|post]",
+    "filter": "filter <predicate>...",
+    "analytics": "analytics [workers]",
+    "stats": "stats",
+    "import": "import <file>",
+    "holders": "holders <species-id-or-name>",
+    "holding": "holding <predicate>...",
+    "export": "export [bfs|pre|in|post] <file>",
+}
+
+
+def batch_species_name(token):
+    """
+    Release/evolve take a species ID or name; turn an ID into the name the core functions expect.
+    """
+    if token.isdigit():
+        pokemon = get_poke_dict_by_id(int(token))
+        if pokemon is not None:
+            return pokemon["Name"]
+    return token
+
+
+def parse_filter_predicates(tokens):
+    """
+    Turn batch filter tokens (type=X, evolvable, attack>N, hp>N, prefix=X) into species_mask keyword arguments.
+    """
+    kwargs = {}
+    for token in tokens:
+        low = token.casefold()
+        if low == "evolvable":
+            kwargs["evolvable"] = True
+        elif low.startswith("type="):
+            kwargs["poke_type"] = token[5:]
+        elif low.startswith("prefix="):
+            kwargs["name_prefix"] = token[7:]
+        elif low.startswith("attack>") and token[7:].isdigit():
+            kwargs["attack_above"] = int(token[7:])
+        elif low.startswith("hp>") and token[3:].isdigit():
+            kwargs["hp_above"] = int(token[3:])
+        else:
+            raise ValueError("unknown filter predicate '" + token + "'")
+    return kwargs
+
+
+def run_batch_command(line):
+    """
+    Execute one batch command against the store. Return its output lines
+    (an iterable of strings) or raise ValueError for a malformed command.
+    """
+    parts = line.split(None, 1)
+    command = parts[0].lower()
+    rest = parts[1].strip() if len(parts) > 1 else ""
+    if command not in BATCH_USAGE:
+        raise ValueError("unknown command '" + parts[0] + "'")
+
+    if command == "sort":
+        return sort_report_lines()
+    if command == "stats":
+        return stats_report_lines(stats_snapshot())
+    if command in ("top", "bottom"):
+        if not rest.isdigit():
+            raise ValueError("usage: " + BATCH_USAGE[command])
+        ranked = owners_top_k(int(rest)) if command == "top" else owners_bottom_k(int(rest))
+        return ["Owner: " + name + " (has " + str(size) + " Pokemon)" for size, name in ranked]
+    if command == "rank":
+        rank = owner_rank(rest)
+        if rank is None:
+            return ["Owner '" + rest + "' not found."]
+        return ["Owner: " + rest + " is #" + str(rank) + " of " + str(rank_count(ranking_index()))]
+    if command == "print":
+        order = rest.lower() or "bfs"
+        if order not in TRAVERSALS:
+            raise ValueError("usage: " + BATCH_USAGE[command])
+        # Reports stream lazily, so they walk a snapshot rather than the live tree.
+        root = snapshot_owners()
+        if root is None:
+            return ["No owners at all."]
+        return (line for node in TRAVERSALS[order](root) for line in owner_report_lines(node))
+    if command == "filter":
+        mask = species_mask(**parse_filter_predicates(rest.split()))
+        return (line for node, matches in filter_all_owners(snapshot_owners(), mask)
+                for line in ("", "Owner: " + node["owner"], *pokemon_list_lines(matches)))
+    if command == "analytics":
+        if rest and not rest.isdigit():
+            raise ValueError("usage: " + BATCH_USAGE[command])
+        return analytics_report_lines(owner_analytics(snapshot_owners(), int(rest) if rest else None))
+    if command == "delete":
+        if not rest:
+            raise ValueError("usage: " + BATCH_USAGE[command])
+        return [delete_owner(rest)]
+    if command == "import":
+        if not rest:
+            raise ValueError("usage: " + BATCH_USAGE[command])
+        return [import_owners(rest)]
+    if command == "export":
+        args = rest.split(None, 1)
+        if len(args) == 2 and args[0].lower() in TRAVERSALS:
+            return [export_owners(args[1].strip(), order=args[0].lower())]
+        if not rest:
+            raise ValueError("usage: " + BATCH_USAGE[command])
+        return [export_owners(rest)]
+    if command == "evolve-all":
+        if not rest:
+            return [evolve_all_owners()]
+        node = find_owner_bst(ownerRoot, rest)
+        if node is None:
+            return ["Owner '" + rest + "' not found."]
+        return [evolve_all_pokemon(node)]
+    if command == "owners":
+        return (node["owner"] for node in iter_owners_with_prefix(snapshot_owners(), rest))
+    if command == "species":
+        return pokemon_list_lines(species_with_prefix(rest))
+    if command == "holders":
+        pokemon = get_poke_dict_by_name(batch_species_name(rest))
+        if pokemon is None:
+            return ["No Pokemon named '" + rest + "'."]
+        names = species_holders(pokemon.id)
+        return [str(len(names)) + " owners hold " + pokemon["Name"] + ".", *names]
+    if command == "holding":
+        holders = owners_holding(species_mask(**parse_filter_predicates(rest.split())))
+        return [str(len(holders)) + " owners match.", *(holders[key] for key in sorted(holders))]
+    if command == "show":
+        node = find_owner_bst(ownerRoot, rest)
+        if node is None:
+            return ["Owner '" + rest + "' not found."]
+        return owner_report_lines(node)
+
+    args = rest.split(None, 1)
+    if len(args) < 2:
+        raise ValueError("usage: " + BATCH_USAGE[command])
+    species, owner_name = args[0], args[1].strip()
+    if command == "create":
+        if not species.isdigit():
+            raise ValueError("usage: " + BATCH_USAGE[command])
+        return [create_owner(owner_name, int(species))]
+    node = find_owner_bst(ownerRoot, owner_name)
+    if node is None:
+        return ["Owner '" + owner_name + "' not found."]
+    if command == "add":
+        if not species.isdigit():
+            raise ValueError("usage: " + BATCH_USAGE[command])
+        return [add_pokemon(node, int(species))]
+    if command == "release":
+        return [release_pokemon(node, batch_species_name(species))]
+    return [evolve_pokemon(node, batch_species_name(species))]
+
+
+def run_batch(lines, out):
+    """
+    Run batch commands from an iterable of lines, writing all results to the
+    text stream 'out'. Return (commands run, errors, seconds elapsed).
+    """
+    write = out.write
+    commands = 0
+    errors = 0
+    start = time.perf_counter()
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        commands += 1
+        try:
+            for result in run_batch_command(line):
+                write(result)
+                write("\n")
+        except ValueError as e:
+            errors += 1
+            write("Line " + str(line_no) + ": " + str(e) + "\n")
+        except Exception as e:
+            # A failing command counts as an error; the rest of the batch still runs.
+            errors += 1
+            write("Line " + str(line_no) + ": " + type(e).__name__ + ": " + str(e) + "\n")
+    return commands, errors, time.perf_counter() - start
+
+
+def batch_main(batch_file, output_file=None):
+    """
+    Run a batch file ('-' for stdin) through one large buffered writer and
+    report throughput on stderr.
+    """
+    if batch_file == "-":
+        source = sys.stdin
+    else:
+        source = open(batch_file, "r", encoding="utf-8")
+    if output_file is None:
+        out = open(sys.stdout.fileno(), "w", encoding="utf-8", buffering=1 << 20, closefd=False)
+    else:
+        out = open(output_file, "w", encoding="utf-8", buffering=1 << 20)
+    try:
+        commands, errors, elapsed = run_batch(source, out)
+    finally:
+        out.close()
+        if source is not sys.stdin:
+            source.close()
+    rate = commands / elapsed if elapsed > 0 else float("inf")
+    print(str(commands) + " commands, " + str(errors) + " errors in " + format(elapsed, ".3f")
+          + "s (" + format(rate, ",.0f") + " ops/sec)", file=sys.stderr)
+    pass
+
+
+########################
+# 13) Instrumentation
+########################
+
+# Opt-in counters for the owner store's hot paths. Nothing here costs anything
+# until enable_instrumentation() runs: it swaps the module-level functions
+# below for wrappers that count calls, bucket latencies by powers of two (in
+# nanoseconds) and, for tree operations, count the nodes visited. Since every
+# caller looks these functions up by name at call time, disabling just puts
+# the originals back. Turn it on with --stats or POKEDEX_STATS=1.
+
+INSTRUMENTED_TREE = ("find_owner_bst", "insert_owner_bst", "delete_owner_bst")
+INSTRUMENTED_TRAVERSALS = ("iter_bfs", "iter_pre_order", "iter_in_order", "iter_post_order")
+INSTRUMENTED_OPS = ("create_owner", "delete_owner", "add_pokemon", "release_pokemon",
+                    "evolve_pokemon", "evolve_all_pokemon", "evolve_all_owners")
+
+# Operation name -> OpStats while instrumentation is on, None while it's off.
+storeStats = None
+instrumentOriginals = {}
+
+
+class OpStats:
+    """
+    Counters for one instrumented function. latency[k] counts calls that took
+    under 2**k ns; visits counts nodes touched (tree operations and walks).
+    """
+    __slots__ = ("calls", "total_ns", "max_ns", "latency", "visits", "max_visits")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.latency = Counter()
+        self.visits = 0
+        self.max_visits = 0
+
+    def record(self, ns, visits=0):
+        self.calls += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.latency[ns.bit_length()] += 1
+        self.visits += visits
+        if visits > self.max_visits:
+            self.max_visits = visits
+
+    def snapshot(self):
+        calls = self.calls
+        return {
+            "calls": calls,
+            "total_ns": self.total_ns,
+            "mean_ns": self.total_ns / calls if calls else 0.0,
+            "max_ns": self.max_ns,
+            "latency_histogram": {1 << k: self.latency[k] for k in sorted(self.latency)},
+            "nodes_visited": self.visits,
+            "mean_nodes_visited": self.visits / calls if calls else 0.0,
+            "max_nodes_visited": self.max_visits,
+        }
+
+
+def counted_find_owner_bst(root, owner_name):
+    """
+    find_owner_bst, also counting the nodes on the search path.
+    """
+    start = time.perf_counter_ns()
+    key = owner_name.casefold()
+    node = root
+    visits = 0
+    while node is not None:
+        visits += 1
+        if key < node["key"]:
+            node = node["left"]
+        elif key > node["key"]:
+            node = node["right"]
+        else:
+            break
+    storeStats["find_owner_bst"].record(time.perf_counter_ns() - start, visits)
+    return node
+
+
+def instrument_recursive(stats, fn):
+    """
+    Wrap a recursive tree function. Its recursive calls go through the module
+    name too, so the outermost call is timed and each nested one counts as one
+    more node visited.
+    """
+    local = threading.local()
+
+    @functools.wraps(fn)
+    def wrapper(*args):
+        if getattr(local, "visits", None) is not None:
+            local.visits += 1
+            return fn(*args)
+        local.visits = 1
+        start = time.perf_counter_ns()
+        try:
+            return fn(*args)
+        finally:
+            stats.record(time.perf_counter_ns() - start, local.visits)
+            local.visits = None
+    return wrapper
+
+
+def instrument_traversal(stats, fn):
+    """
+    Wrap a traversal generator: one call per walk, timed from the first node
+    to the last (the consumer's time included), visits = nodes yielded.
+    """
+    @functools.wraps(fn)
+    def wrapper(root):
+        start = time.perf_counter_ns()
+        visits = 0
+        try:
+            for node in fn(root):
+                visits += 1
+                yield node
+        finally:
+            stats.record(time.perf_counter_ns() - start, visits)
+    return wrapper
+
+
+def instrument_call(stats, fn):
+    """
+    Wrap a plain function: count and time every call.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args):
+        start = time.perf_counter_ns()
+        try:
+            return fn(*args)
+        finally:
+            stats.record(time.perf_counter_ns() - start)
+    return wrapper
+
+
+def enable_instrumentation():
+    """
+    Start collecting stats (a no-op if already on).
+    """
+    global storeStats
+    if storeStats is not None:
+        return
+    module = globals()
+    stats = {name: OpStats() for name in INSTRUMENTED_TREE + INSTRUMENTED_TRAVERSALS + INSTRUMENTED_OPS}
+    for name in stats:
+        instrumentOriginals[name] = module[name]
+    module["find_owner_bst"] = counted_find_owner_bst
+    for name in ("insert_owner_bst", "delete_owner_bst"):
+        module[name] = instrument_recursive(stats[name], instrumentOriginals[name])
+    for name in INSTRUMENTED_TRAVERSALS:
+        module[name] = instrument_traversal(stats[name], instrumentOriginals[name])
+    for name in INSTRUMENTED_OPS:
+        module[name] = instrument_call(stats[name], instrumentOriginals[name])
+    for order, walk in TRAVERSALS.items():
+        TRAVERSALS[order] = module[walk.__name__]
+    storeStats = stats
+
+
+def disable_instrumentation():
+    """
+    Put the uninstrumented functions back and drop the collected stats.
+    """
+    global storeStats
+    if storeStats is None:
+        return
+    module = globals()
+    module.update(instrumentOriginals)
+    for order in TRAVERSALS:
+        TRAVERSALS[order] = instrumentOriginals[TRAVERSALS[order].__name__]
+    instrumentOriginals.clear()
+    storeStats = None
+
+
+def reset_stats():
+    """
+    Zero every counter without turning instrumentation off.
+    """
+    if storeStats is not None:
+        for stats in storeStats.values():
+            stats.reset()
+    pass
+
+
+def stats_snapshot():
+    """
+    Return the current stats as plain data:
+    {'enabled', 'tree': {'size', 'height'}, 'ops': {name: OpStats.snapshot()}}.
+    The tree shape is reported even when instrumentation is off; it comes
+    from ownerCount and the root's cached height, so no index is built and
+    no node is visited.
+    """
+    with STORE_LOCK:
+        size = ownerCount
+        height = node_height(ownerRoot)
+    ops = {}
+    if storeStats is not None:
+        ops = {name: stats.snapshot() for name, stats in storeStats.items()}
+    return {"enabled": storeStats is not None, "tree": {"size": size, "height": height}, "ops": ops}
+
+
+def format_ns(ns):
+    if ns < 1000:
+        return format(ns, ".0f") + "ns"
+    if ns < 1000000:
+        return format(ns / 1000, ".1f") + "us"
+    return format(ns / 1000000, ".1f") + "ms"
+
+
+def stats_report_lines(snapshot):
+    """
+    Yield a readable report of a stats_snapshot().
+    """
+    tree = snapshot["tree"]
+    yield "Owners: " + str(tree["size"]) + ", tree height: " + str(tree["height"])
+    if not snapshot["enabled"]:
+        yield "Instrumentation is off (start with --stats or POKEDEX_STATS=1)."
+        return
+    for name, op in snapshot["ops"].items():
+        if not op["calls"]:
+            continue
+        line = (name + ": " + str(op["calls"]) + " calls, mean " + format_ns(op["mean_ns"])
+                + ", max " + format_ns(op["max_ns"]))
+        if op["nodes_visited"]:
+            line += (", " + format(op["mean_nodes_visited"], ".1f") + " nodes/call (max "
+                     + str(op["max_nodes_visited"]) + ")")
+        yield line
+        yield "  latency: " + ", ".join("<" + format_ns(bound) + " " + str(count)
+                                       for bound, count in op["latency_histogram"].items())
+
+
+########################
+# 14) Bulk Import
+########################
+
+# import_owners() loads owners from a CSV file (owner name, then species IDs
+# in the same cell separated by spaces or in further cells; a leading 'owner'
+# header row is skipped), a JSON Lines file ({"owner": ..., "pokemon":
+# [ids]}) or a binary export (section 17), any of them optionally gzipped.
+# These are exactly the formats export_owners() writes. Rows are parsed as a stream and sorted by key in chunks of
+# IMPORT_CHUNK_ROWS; past one chunk, the sorted runs are spilled to temp files
+# and merged. The merged stream is zipped with an in-order walk of the current
+# tree and the whole tree is relinked from that sorted sequence in O(n),
+# instead of one rebalancing insert per owner. Owners already in the store
+# gain any new species; a new owner needs at least one known species, just
+# like a starter.
+
+IMPORT_CHUNK_ROWS = 1 << 18
+IMPORT_SPILL_BLOCK = 4096   # records per marshal.dump in a spill file
+OWNER_FILE_BUFFER = 1 << 20
+
+
+def owner_file_format(filename):
+    """
+    Guess (format, gzipped) from a file name: .csv, .jsonl/.ndjson/.json or
+    .bin, optionally followed by .gz. Anything else is read as CSV.
+    """
+    name = filename.lower()
+    compressed = name.endswith(".gz")
+    if compressed:
+        name = name[:-3]
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl", compressed
+    if name.endswith(".bin"):
+        return "bin", compressed
+    return "csv", compressed
+
+
+def open_owner_file(filename, mode, fmt, compressed):
+    """
+    Open an import/export file for reading ('r') or writing ('w') through a
+    large buffer. CSV and JSON Lines get a UTF-8 text layer; 'bin' stays binary.
+    """
+    if compressed:
+        f = gzip.open(filename, mode + "b")
+        if mode == "w":
+            f = io.BufferedWriter(f, OWNER_FILE_BUFFER)
+    else:
+        f = open(filename, mode + "b", buffering=OWNER_FILE_BUFFER)
+    if fmt == "bin":
+        return f
+    return io.TextIOWrapper(f, encoding="utf-8", newline="")
+
+
+def iter_import_records(f, fmt, counts):
+    """
+    Yield (key, owner name, species IDs) for each usable row of an import
+    stream. Malformed rows are counted in counts['skipped'].
+    """
+    if fmt == "bin":
+        yield from iter_binary_owners(f, counts)
+        return
+    if fmt == "jsonl":
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+                name = str(row["owner"]).strip()
+                ids = [int(poke_id) for poke_id in row.get("pokemon", [])]
+            except (ValueError, KeyError, TypeError, AttributeError):
+                counts["skipped"] += 1
+                continue
+            if not name:
+                counts["skipped"] += 1
+                continue
+            yield name.casefold(), name, ids
+        return
+    for row_no, row in enumerate(csv.reader(f)):
+        if not row:
+            continue
+        name = row[0].strip()
+        if row_no == 0 and name.casefold() == "owner":
+            continue
+        try:
+            ids = [int(token) for cell in row[1:] for token in cell.replace(";", " ").split()]
+        except ValueError:
+            counts["skipped"] += 1
+            continue
+        if not name:
+            counts["skipped"] += 1
+            continue
+        yield name.casefold(), name, ids
+
+
+def iter_spilled_run(f):
+    """
+    Yield the records marshalled (in blocks) into a spill file, then close it.
+    """
+    try:
+        f.seek(0)
+        while True:
+            yield from marshal.load(f)
+    except EOFError:
+        pass
+    finally:
+        f.close()
+
+
+def sort_import_records(records, chunk_rows=IMPORT_CHUNK_ROWS):
+    """
+    Return an iterator over the records in key order. Input that fits in one
+    chunk is sorted in memory; otherwise each sorted chunk is spilled to a
+    temp file and the runs are merged. Both sorts are stable, so rows for
+    the same owner stay in file order.
+    """
+    runs = []
+    while True:
+        chunk = list(itertools.islice(records, chunk_rows))
+        chunk.sort(key=itemgetter(0))
+        if not runs and len(chunk) < chunk_rows:
+            return iter(chunk)
+        if not chunk:
+            break
+        f = tempfile.TemporaryFile()
+        for i in range(0, len(chunk), IMPORT_SPILL_BLOCK):
+            marshal.dump(chunk[i:i + IMPORT_SPILL_BLOCK], f)
+        runs.append(f)
+        if len(chunk) < chunk_rows:
+            break
+    return heapq.merge(*(iter_spilled_run(f) for f in runs), key=itemgetter(0))
+
+
+def coalesce_import_records(records):
+    """
+    Merge consecutive records for the same owner (sorted input). The first
+    row's spelling of the name wins.
+    """
+    for key, group in itertools.groupby(records, key=itemgetter(0)):
+        _, name, ids = next(group)
+        for _, _, more in group:
+            ids.extend(more)
+        yield key, name, ids
+
+
+def import_sorted_owners(incoming, by_id, counts):
+    """
+    Merge sorted (key, name, IDs) records into the owner tree and relink it
+    balanced. Tallies go into 'counts'.
+    """
+    global ownerRoot, ownerCount, ownerRanking, ownerHolders
+    with STORE_LOCK:
+        nodes = []
+        existing = iter_in_order(ownerRoot)
+        current = next(existing, None)
+        for key, name, ids in incoming:
+            while current is not None and current["key"] < key:
+                nodes.append(current)
+                current = next(existing, None)
+            known = [poke_id for poke_id in ids if poke_id in by_id]
+            counts["unknown"] += len(ids) - len(known)
+            if current is not None and current["key"] == key:
+                current = writable_node(current)
+                pokedex = current["pokedex"]
+                before = len(pokedex)
+                for poke_id in known:
+                    if not pokedex.has_id(poke_id):
+                        pokedex.append(by_id[poke_id])
+                counts["added"] += len(pokedex) - before
+                counts["updated"] += 1
+                nodes.append(current)
+                current = next(existing, None)
+            elif known:
+                node = new_owner_node(name, list(dict.fromkeys(known)))
+                counts["added"] += len(node["pokedex"])
+                counts["created"] += 1
+                nodes.append(node)
+            else:
+                counts["skipped"] += 1
+        if current is not None:
+            nodes.append(current)
+            nodes.extend(existing)
+        ownerRoot = build_owner_tree(nodes)
+        ownerCount = len(nodes)
+        # Sizes changed wholesale: rebuild the secondary indexes lazily.
+        ownerRanking = None
+        ownerHolders = None
+    # Fold the import into a fresh snapshot rather than journaling each row.
+    # compact() takes its own locks (compact_lock before STORE_LOCK, like the
+    # journal thread), so it must run after STORE_LOCK is released.
+    if ownerJournal is not None:
+        ownerJournal.compact()
+    pass
+
+
+def import_owners(filename, fmt=None, chunk_rows=IMPORT_CHUNK_ROWS):
+    """
+    Bulk-load owners from a CSV, JSON Lines or binary file (by extension
+    unless fmt is 'csv', 'jsonl' or 'bin'; '.gz' means gzipped) and rebuild
+    the balanced tree once. Prints nothing per row; return a one-line summary.
+    """
+    guessed, compressed = owner_file_format(filename)
+    fmt = fmt or guessed
+    try:
+        f = open_owner_file(filename, "r", fmt, compressed)
+    except OSError as e:
+        return "Cannot import '" + filename + "': " + (e.strerror or str(e)) + "."
+    by_id = get_catalog().by_id
+    counts = Counter()
+    start = time.perf_counter()
+    # Millions of fresh node dicts would otherwise trigger repeated full
+    # collections; the import creates no reference cycles.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with f:
+            # sort_import_records reads the whole file before anything is
+            # merged, so a bad file leaves the store untouched.
+            import_sorted_owners(
+                coalesce_import_records(sort_import_records(iter_import_records(f, fmt, counts), chunk_rows)),
+                by_id, counts)
+    except (OSError, EOFError, ValueError) as e:
+        return "Cannot import '" + filename + "': " + str(e) + "."
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return ("Imported " + filename + ": " + str(counts["created"]) + " new owners, "
+            + str(counts["updated"]) + " updated, " + str(counts["added"]) + " Pokemon added, "
+            + str(counts["skipped"]) + " rows skipped, " + str(counts["unknown"]) + " unknown IDs ("
+            + format(time.perf_counter() - start, ".2f") + "s).")
+
+
+########################
+# 15) Species Holders Index
+########################
+
+# ownerHolders[species ID] maps the key of every owner holding that species to
+# the owner's name. Every single-owner mutation updates it in place; whole-
+# store operations (evolve everyone, import, loading a store) drop it so it
+# is rebuilt on next use. "Who holds X" and "how many hold X" then cost
+# O(answer) and O(1), and "who holds anything matching a filter" only
+# touches the matching species.
+
+def holders_index():
+    """
+    Return the holders index, building it with one tree walk on first use.
+    """
+    global ownerHolders
+    if ownerHolders is None:
+        with STORE_LOCK:
+            if ownerHolders is None:
+                holders = [{} for _ in range(get_catalog().size)]
+                for node in iter_pre_order(ownerRoot):
+                    key, name = node["key"], node["owner"]
+                    for poke_id in node["pokedex"].ids:
+                        holders[poke_id][key] = name
+                ownerHolders = holders
+    return ownerHolders
+
+def holders_update(owner_node, removed=(), added=()):
+    """
+    Record that an owner dropped the species IDs in 'removed' and gained
+    those in 'added'. Does nothing while the index hasn't been built. Call
+    with STORE_LOCK held.
+    """
+    if ownerHolders is None:
+        return
+    key = owner_node["key"]
+    for poke_id in removed:
+        ownerHolders[poke_id].pop(key, None)
+    for poke_id in added:
+        ownerHolders[poke_id][key] = owner_node["owner"]
+
+def holders_resync(owner_node, old_ids):
+    """
+    Bring the index in line after an owner's pokedex went from 'old_ids' to its current IDs.
+    """
+    if ownerHolders is None:
+        return
+    old = set(old_ids)
+    new = set(owner_node["pokedex"].ids)
+    holders_update(owner_node, removed=old - new, added=new - old)
+
+def species_holder_count(poke_id):
+    """
+    Return how many owners hold a species.
+    """
+    holders = holders_index()
+    return len(holders[poke_id]) if 0 <= poke_id < len(holders) else 0
+
+def species_holders(poke_id):
+    """
+    Return the names of the owners holding a species, alphabetically (case-insensitive).
+    """
+    holders = holders_index()
+    if not 0 <= poke_id < len(holders):
+        return []
+    by_key = holders[poke_id]
+    return [by_key[key] for key in sorted(by_key)]
+
+def owners_holding(mask):
+    """
+    Return {owner key: owner name} for every owner holding at least one
+    species in a species_mask, e.g. everyone with a Water type.
+    """
+    holders = holders_index()
+    result = {}
+    for poke_id in itertools.compress(range(len(mask)), mask):
+        result.update(holders[poke_id])
+    return result
+
+
+########################
+# 16) In-memory Snapshots
+########################
+
+# Thanks to the persistent owner tree (see section 2), a consistent copy of
+# the whole store costs O(1) to take: the old root simply stops being
+# modified. Reports, exports and undo work from such a root while the live
+# tree keeps changing. Memory grows by at most one root-to-node path per
+# change after a snapshot, and old versions are freed once nothing refers to
+# their root.
+
+def snapshot_owners():
+    """
+    Return the root of a frozen view of the owner tree (None if empty).
+    """
+    global ownerGeneration
+    with STORE_LOCK:
+        # Every change copies the root into the live generation, so an older
+        # root means nothing changed since the last snapshot: share it.
+        if ownerRoot is not None and ownerRoot.get("gen", -1) == ownerGeneration:
+            ownerGeneration += 1
+        return ownerRoot
+
+def restore_owners(snapshot_root):
+    """
+    Make a root returned by snapshot_owners() the live tree again (undo).
+    The snapshot stays frozen, so it can be restored more than once.
+    """
+    global ownerRoot, ownerCount, ownerGeneration, ownerRanking, ownerHolders
+    with STORE_LOCK:
+        ownerRoot = snapshot_root
+        ownerCount = sum(1 for _ in iter_pre_order(snapshot_root))
+        ownerGeneration += 1
+        ownerRanking = None
+        ownerHolders = None
+    # The journal can't express a rewind; fold the restored tree into a
+    # fresh snapshot instead (outside STORE_LOCK, see import_sorted_owners).
+    if ownerJournal is not None:
+        ownerJournal.compact()
+    pass
+
+
+########################
+# 17) Export
+########################
+
+# export_owners() streams every owner of a snapshot (section 16) to a file in
+# any of the TRAVERSALS orders, through a 1 MiB buffer and optionally gzip.
+# Nothing is collected first, so memory stays flat however big the store is
+# (the walk itself keeps one root-to-leaf stack; BFS keeps one level). The
+# formats are the ones import_owners() reads:
+#   csv    owner,pokemon   (species IDs space-separated in one cell)
+#   jsonl  {"owner": ..., "pokemon": [ids]} per line
+#   bin    EXPORT_HEADER (magic, version), then per owner EXPORT_RECORD
+#          (name length in bytes, number of species) + the UTF-8 name +
+#          the species IDs as little-endian uint16, until end of file.
+
+EXPORT_MAGIC = b"PKEX"
+EXPORT_VERSION = 1
+EXPORT_HEADER = struct.Struct("<4sH")
+EXPORT_RECORD = struct.Struct("<HH")
+
+
+def export_owners(filename, fmt=None, order="in", compressed=None):
+    """
+    Write every owner and their species IDs to 'filename'. The format and
+    gzip are taken from the extension unless given. Return a one-line summary.
+    """
+    if order not in TRAVERSALS:
+        raise ValueError("unknown traversal order '" + order + "'")
+    guessed, guessed_compressed = owner_file_format(filename)
+    fmt = fmt or guessed
+    if compressed is None:
+        compressed = guessed_compressed
+    root = snapshot_owners()
+    start = time.perf_counter()
+    owners = pokemon = 0
+    try:
+        f = open_owner_file(filename, "w", fmt, compressed)
+    except OSError as e:
+        return "Cannot export to '" + filename + "': " + (e.strerror or str(e)) + "."
+    with f:
+        write = f.write
+        if fmt == "csv":
+            writerow = csv.writer(f, lineterminator="\n").writerow
+            writerow(("owner", "pokemon"))
+        elif fmt == "bin":
+            write(EXPORT_HEADER.pack(EXPORT_MAGIC, EXPORT_VERSION))
+        for node in TRAVERSALS[order](root):
+            ids = node["pokedex"].ids
+            owners += 1
+            pokemon += len(ids)
+            if fmt == "csv":
+                writerow((node["owner"], " ".join(map(str, ids))))
+            elif fmt == "jsonl":
+                # Same bytes as json.dumps of the whole dict, without building it.
+                write('{"owner": ' + json.dumps(node["owner"], ensure_ascii=False)
+                      + ', "pokemon": [' + ", ".join(map(str, ids)) + "]}\n")
+            else:
+                name = node["owner"].encode("utf-8")
+                if sys.byteorder != "little":
+                    ids = array(POKEDEX_TYPECODE, ids)
+                    ids.byteswap()
+                write(EXPORT_RECORD.pack(len(name), len(ids)))
+                write(name)
+                write(ids)
+    return ("Exported " + str(owners) + " owners (" + str(pokemon) + " Pokemon) to " + filename
+            + " in " + format(time.perf_counter() - start, ".2f") + "s.")
+
+
+def iter_binary_owners(f, counts):
+    """
+    Yield (key, owner name, species IDs) from a binary export stream. A
+    truncated last record is counted in counts['skipped'].
+    """
+    header = f.read(EXPORT_HEADER.size)
+    if len(header) < EXPORT_HEADER.size or EXPORT_HEADER.unpack(header) != (EXPORT_MAGIC, EXPORT_VERSION):
+        raise ValueError("not an owner export file")
+    read = f.read
+    while True:
+        head = read(EXPORT_RECORD.size)
+        if not head:
+            return
+        if len(head) < EXPORT_RECORD.size:
+            counts["skipped"] += 1
+            return
+        name_len, count = EXPORT_RECORD.unpack(head)
+        name = read(name_len)
+        data = read(2 * count)
+        if len(name) < name_len or len(data) < 2 * count:
+            counts["skipped"] += 1
+            return
+        ids = array(POKEDEX_TYPECODE)
+        ids.frombytes(data)
+        if sys.byteorder != "little":
+            ids.byteswap()
+        name = name.decode("utf-8")
+        yield name.casefold(), name, ids.tolist()
+
+
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Hoenn Pokedex manager")
+    parser.add_argument("--snapshot", help="load owners from this file on start and save them on exit")
+    parser.add_argument("--journal", help="also log every change to this file for crash recovery (needs --snapshot)")
+    parser.add_argument("--batch", metavar="FILE", help="run commands from FILE ('-' for stdin) instead of the menu")
+    parser.add_argument("--output", metavar="FILE", help="with --batch, write results here instead of stdout")
+    parser.add_argument("--stats", action="store_true", help="collect call counts and latencies (also POKEDEX_STATS=1)")
+    parser.add_argument("--import", dest="import_file", metavar="FILE",
+                        help="bulk-load owners from a CSV, JSON Lines or binary file before starting")
+    parser.add_argument("--export", metavar="FILE",
+                        help="write every owner to FILE (.csv, .jsonl or .bin, optionally .gz) instead of the menu")
+    parser.add_argument("--export-order", choices=sorted(TRAVERSALS), default="in",
+                        help="traversal order for --export (default: in)")
+    args = parser.parse_args()
+    if args.journal and not args.snapshot:
+        parser.error("--journal needs --snapshot")
+    if args.stats or os.environ.get("POKEDEX_STATS", "") not in ("", "0"):
+        enable_instrumentation()
+    if args.batch is None and args.export is None:
+        main(args.snapshot, args.journal, args.import_file)
+    else:
+        if args.snapshot is not None:
+            open_owner_store(args.snapshot, args.journal)
+        if args.import_file is not None:
+            print(import_owners(args.import_file), file=sys.stderr)
+        if args.batch is not None:
+            batch_main(args.batch, args.output)
+        if args.export is not None:
+            print(export_owners(args.export, order=args.export_order), file=sys.stderr)
+        if args.snapshot is not None:
+            close_owner_store(args.snapshot)
@@ -0,0 +1,223 @@
+# pokedex_bench.py
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import ex7
+
+# Benchmarks for the owner tree and pokedex operations. For every scale and
+# insertion order a synthetic store is generated and each operation timed
+# (best of --repeat runs). Results are written as JSON; with --baseline the
+# run is compared against an earlier results file and any operation slower
+# than --threshold times its baseline is reported and fails the run.
+#
+# Insertion orders:
+#   random       owners shuffled
+#   sorted       owners in alphabetical order (degenerates an unbalanced BST)
+#   adversarial  alternating from both ends of the alphabet (a, z, b, y, ...)
+
+DEFAULT_SCALES = [1000, 10000, 100000]
+ORDERS = ["random", "sorted", "adversarial"]
+FILTERS = {
+    "type": {"poke_type": "Water"},
+    "evolvable": {"evolvable": True},
+    "attack_above": {"attack_above": 80},
+    "hp_above": {"hp_above": 60},
+    "name_prefix": {"name_prefix": "s"},
+    "combined": {"poke_type": "Water", "hp_above": 60, "evolvable": True},
+}
+
+
+def owner_names(n, order, rng):
+    names = ["owner" + format(i, "08d") for i in range(n)]
+    if order == "random":
+        rng.shuffle(names)
+    elif order == "adversarial":
+        zigzag = []
+        lo, hi = 0, n - 1
+        while lo <= hi:
+            zigzag.append(names[lo])
+            if lo != hi:
+                zigzag.append(names[hi])
+            lo += 1
+            hi -= 1
+        names = zigzag
+    return names
+
+
+def make_nodes(names, rng, species_count):
+    return [ex7.new_owner_node(name, rng.sample(range(1, species_count + 1), rng.randint(1, 20)))
+            for name in names]
+
+
+def timed(fn, repeat, setup=None):
+    """
+    Best wall time of 'repeat' runs of fn(state), where state = setup() is rebuilt (untimed) before each run.
+    """
+    best = None
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        start = time.perf_counter()
+        fn(state)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def build_tree(nodes):
+    root = None
+    for node in nodes:
+        node["left"] = node["right"] = None
+        node["height"] = 1
+        root = ex7.insert_owner_bst(root, node)
+    return root
+
+
+def exhaust(iterator):
+    for _ in iterator:
+        pass
+
+
+def bench_scale(n, order, repeat, rng):
+    """
+    Time every operation for one (scale, order). Return a list of result dicts.
+    """
+    species_count = len(ex7.get_catalog())
+    names = owner_names(n, order, rng)
+    nodes = make_nodes(names, rng, species_count)
+    lookups = rng.sample(names, len(names))
+    results = []
+
+    def record(op, seconds, ops):
+        results.append({"op": op, "scale": n, "order": order, "seconds": seconds,
+                        "ns_per_op": seconds / ops * 1e9 if ops else 0.0})
+
+    record("insert_owner_bst", timed(lambda _: build_tree(nodes), repeat), n)
+    root = build_tree(nodes)
+
+    def find_all(_):
+        find = ex7.find_owner_bst
+        for name in lookups:
+            find(root, name)
+    record("find_owner_bst", timed(find_all, repeat), n)
+
+    for op, walk in (("iter_bfs", ex7.iter_bfs), ("iter_pre_order", ex7.iter_pre_order),
+                     ("iter_in_order", ex7.iter_in_order), ("iter_post_order", ex7.iter_post_order)):
+        record(op, timed(lambda _: exhaust(walk(root)), repeat), n)
+
+    ex7.ownerRoot = root
+
+    def sort_cold(_):
+        ex7.ownerRanking = None
+        exhaust(ex7.sort_report_lines())
+    record("sort_owners_by_num_pokemon:cold", timed(sort_cold, repeat), n)
+    record("sort_owners_by_num_pokemon:warm", timed(lambda _: exhaust(ex7.sort_report_lines()), repeat), n)
+
+    for label, kwargs in FILTERS.items():
+        def run_filter(_):
+            mask = ex7.species_mask(**kwargs)
+            exhaust(ex7.filter_all_owners(root, mask))
+        record("filter:" + label, timed(run_filter, repeat), n)
+
+    def delete_all(tree):
+        for name in lookups:
+            tree = ex7.delete_owner_bst(tree, name)
+    record("delete_owner_bst", timed(delete_all, repeat, setup=lambda: build_tree(nodes)), n)
+
+    ex7.ownerRoot = None
+    ex7.ownerRanking = None
+    return results
+
+
+def bench_catalog(repeat):
+    path = ex7.CATALOG_CSV
+    results = []
+    seconds = timed(lambda _: ex7.read_hoenn_csv(path), repeat)
+    results.append({"op": "read_hoenn_csv", "scale": 0, "order": "-", "seconds": seconds,
+                    "ns_per_op": seconds * 1e9})
+    ex7.load_catalog(path)  # make sure the cache exists
+    seconds = timed(lambda _: ex7.load_catalog(path), repeat)
+    results.append({"op": "load_catalog:cached", "scale": 0, "order": "-", "seconds": seconds,
+                    "ns_per_op": seconds * 1e9})
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Pair each result with its baseline entry. Return (comparison rows, regressions).
+    """
+    by_key = {(r["op"], r["scale"], r["order"]): r for r in baseline.get("results", [])}
+    rows = []
+    regressions = []
+    for r in results:
+        base = by_key.get((r["op"], r["scale"], r["order"]))
+        if base is None or not base["seconds"]:
+            continue
+        ratio = r["seconds"] / base["seconds"]
+        row = {"op": r["op"], "scale": r["scale"], "order": r["order"],
+               "baseline_seconds": base["seconds"], "seconds": r["seconds"], "ratio": ratio}
+        rows.append(row)
+        if ratio > threshold:
+            regressions.append(row)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ex7 owner tree and pokedex operations")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="owner counts to test (default: 1000 10000 100000; add 1000000 for the full run)")
+    parser.add_argument("--orders", nargs="+", choices=ORDERS, default=ORDERS)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the best is kept")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="compare against this earlier results file")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown ratio that counts as a regression (default: 1.25)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = bench_catalog(args.repeat)
+    for n in args.scales:
+        for order in args.orders:
+            print("benchmarking " + str(n) + " owners, " + order + " order", file=sys.stderr)
+            results.extend(bench_scale(n, order, args.repeat, rng))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["comparison"], regressions = compare(results, baseline, args.threshold)
+        report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for row in regressions:
+        print("REGRESSION " + row["op"] + " @ " + str(row["scale"]) + "/" + row["order"] + ": "
+              + format(row["ratio"], ".2f") + "x baseline", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
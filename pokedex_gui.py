@@ -1,93 +1,464 @@
-# pokedex_gui.py
-
-import tkinter as tk
-from PIL import Image, ImageTk
-import os
-
-
-def show_Pokedex_GUI(pokeList):
-    """
-    Display each Pokemon in a simple Tkinter window with its Name, Type, HP,
-    Attack, and optionally an image from the 'pokemons' folder.
-    We allow horizontal resizing so each Pokemon 'frame' expands in width.
-    """
-    root = tk.Tk()
-    root.title("My Pokedex GUI")
-
-    # Create a canvas and a vertical scrollbar
-    canvas = tk.Canvas(root)
-    scrollbar = tk.Scrollbar(root, orient="vertical", command=canvas.yview)
-    canvas.configure(yscrollcommand=scrollbar.set)
-
-    # This 'scrollable_frame' is where we'll place each Pokemon frame.
-    scrollable_frame = tk.Frame(canvas)
-
-    # A callback to update the scrollregion whenever 'scrollable_frame' changes size
-    def on_frame_configure(event):
-        canvas.configure(scrollregion=canvas.bbox("all"))
-
-    scrollable_frame.bind("<Configure>", on_frame_configure)
-
-    # Actually place 'scrollable_frame' in the canvas
-    # We'll store the canvas window ID so we can update its width on resize
-    canvas_window = canvas.create_window(
-        (0, 0), window=scrollable_frame, anchor="nw")
-
-    # A callback to keep the scrollable_frame the same width as the canvas
-    def on_canvas_configure(event):
-        # Set the scrollable_frame width to match canvas' width
-        canvas.itemconfig(canvas_window, width=event.width)
-
-    canvas.bind("<Configure>", on_canvas_configure)
-
-    # Mouse wheel handling
-    def on_mouse_wheel(event):
-        # On Windows/macOS: event.delta is typically ±120 per wheel step
-        canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-
-    canvas.bind_all("<MouseWheel>", on_mouse_wheel)  # Windows/macOS
-    # For Linux (buttons 4=up, 5=down):
-    canvas.bind_all("<Button-4>", lambda e: canvas.yview_scroll(-1, "units"))
-    canvas.bind_all("<Button-5>", lambda e: canvas.yview_scroll(1, "units"))
-
-    # Pack the canvas and scrollbar
-    canvas.pack(side="left", fill="both", expand=True)
-    scrollbar.pack(side="right", fill="y")
-
-    if not pokeList:
-        msg = tk.Label(scrollable_frame, text="No Pokemon in this Pokedex!")
-        msg.pack(padx=10, pady=10)
-    else:
-        for poke in pokeList:
-            # Create a frame for each Pokémon, fill horizontally, expand so it can grow
-            frame = tk.Frame(scrollable_frame, bd=2,
-                             relief='groove', padx=5, pady=5)
-            frame.pack(side="top", fill="x", expand=True, padx=10, pady=5)
-
-            # Pokemon text info
-            info = (
-                f"ID: {poke['ID']} | "
-                f"Name: {poke['Name']} | "
-                f"Type: {poke['Type']} | "
-                f"HP: {poke['HP']} | "
-                f"Attack: {poke['Attack']} | "
-                f"Can Evolve: {poke['Can Evolve']}"
-            )
-            # The text label also fills horizontally and expands
-            label = tk.Label(frame, text=info, anchor="w")
-            label.pack(side="left", fill="x", expand=True)
-
-            image_path = os.path.join("pokemons", f"{poke['ID'] + 251}.png")
-            if os.path.exists(image_path):
-                try:
-                    img = Image.open(image_path)
-                    img = img.resize((80, 80), Image.ANTIALIAS)
-                    photo = ImageTk.PhotoImage(img)
-                    picLabel = tk.Label(frame, image=photo)
-                    picLabel.photo = photo  # keep reference
-                    picLabel.pack(side="right", padx=5)
-                except Exception as e:
-                    print(f"Error loading image {image_path}: {e}")
-                    # If error, we'll ignore and just not show the image
-
-    root.mainloop()
+# pokedex_gui.py
+
+import tkinter as tk
+import mmap
+import queue
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageTk
+import os
+
+SPRITE_DIR = "pokemons"
+THUMB_DIR = os.path.join(SPRITE_DIR, ".thumbs")
+THUMB_SIZE = (80, 80)
+
+# Image.ANTIALIAS is gone in current Pillow; LANCZOS is the same filter.
+RESAMPLE = getattr(Image, "Resampling", Image).LANCZOS
+
+
+def sprite_path(species_id):
+    """
+    Path of the full-size sprite for a species (the files are numbered by national dex ID).
+    """
+    return os.path.join(SPRITE_DIR, f"{species_id + 251}.png")
+
+
+# Sprite atlas: every sprite pre-resized to the common sizes and stored as
+# raw RGBA tiles in one file, so the GUI maps a single file instead of
+# stat-ing and decoding a PNG per row. Layout (little-endian):
+#   ATLAS_HEADER  magic, version, number of tiles
+#   ATLAS_ENTRY   per tile: species ID, width, height, byte offset of its pixels
+#   pixels        width * height * 4 bytes per tile
+# It's a build artifact: run "python pokedex_gui.py build-atlas" after
+# changing the sprites.
+ATLAS_PATH = os.path.join(SPRITE_DIR, "sprites.atlas")
+ATLAS_MAGIC = b"PKAT"
+ATLAS_VERSION = 1
+ATLAS_HEADER = struct.Struct("<4sHI")
+ATLAS_ENTRY = struct.Struct("<HHHQ")
+
+
+def iter_sprite_files():
+    """
+    Yield (species ID, path) for every numbered sprite in SPRITE_DIR.
+    """
+    for name in sorted(os.listdir(SPRITE_DIR)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() == ".png" and stem.isdigit():
+            yield int(stem) - 251, os.path.join(SPRITE_DIR, name)
+
+
+def build_sprite_atlas(path=ATLAS_PATH, sizes=(THUMB_SIZE,)):
+    """
+    Pack every sprite, resized to each of 'sizes', into one atlas file. Return the number of tiles.
+    """
+    tiles = []
+    for species_id, source in iter_sprite_files():
+        with Image.open(source) as img:
+            img = img.convert("RGBA")
+            for size in sizes:
+                tiles.append((species_id, size, img.resize(size, RESAMPLE).tobytes()))
+
+    offset = ATLAS_HEADER.size + ATLAS_ENTRY.size * len(tiles)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(ATLAS_HEADER.pack(ATLAS_MAGIC, ATLAS_VERSION, len(tiles)))
+        for species_id, size, pixels in tiles:
+            f.write(ATLAS_ENTRY.pack(species_id, size[0], size[1], offset))
+            offset += len(pixels)
+        for _, _, pixels in tiles:
+            f.write(pixels)
+    os.replace(tmp, path)
+    return len(tiles)
+
+
+class SpriteAtlas:
+    """
+    Read-only, memory-mapped view of a sprite atlas.
+    """
+
+    def __init__(self, path=ATLAS_PATH):
+        with open(path, "rb") as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = ATLAS_HEADER.unpack_from(self.buf, 0)
+        if magic != ATLAS_MAGIC or version != ATLAS_VERSION:
+            raise ValueError(f"{path} is not a version {ATLAS_VERSION} sprite atlas")
+        self.offsets = {}
+        self.species = set()
+        for i in range(count):
+            species_id, width, height, offset = ATLAS_ENTRY.unpack_from(
+                self.buf, ATLAS_HEADER.size + i * ATLAS_ENTRY.size)
+            self.offsets[(species_id, (width, height))] = offset
+            self.species.add(species_id)
+
+    def tile(self, species_id, size=THUMB_SIZE):
+        """
+        Return the tile as a PIL image, or None if the atlas doesn't have it at this size.
+        """
+        offset = self.offsets.get((species_id, tuple(size)))
+        if offset is None:
+            return None
+        pixels = self.buf[offset:offset + size[0] * size[1] * 4]
+        return Image.frombytes("RGBA", tuple(size), pixels)
+
+
+_atlas = None
+_atlas_checked = False
+_atlas_lock = threading.Lock()
+
+
+def get_atlas():
+    """
+    Return the SpriteAtlas if one has been built, else None. Opened once per process.
+    """
+    global _atlas, _atlas_checked
+    if not _atlas_checked:
+        with _atlas_lock:
+            if not _atlas_checked:
+                try:
+                    _atlas = SpriteAtlas()
+                except (OSError, ValueError):
+                    _atlas = None
+                _atlas_checked = True
+    return _atlas
+
+
+def load_thumbnail_image(species_id, size=THUMB_SIZE):
+    """
+    Return a resized PIL image for a species, or None if it has no sprite.
+    Tiles come from the sprite atlas when one has been built. Otherwise
+    resized copies are kept on disk under THUMB_DIR and reused until the
+    source sprite is modified, so each sprite is only decoded at full size once.
+    """
+    atlas = get_atlas()
+    if atlas is not None:
+        img = atlas.tile(species_id, size)
+        if img is not None:
+            return img
+    source = sprite_path(species_id)
+    try:
+        source_mtime = os.stat(source).st_mtime
+    except OSError:
+        return None
+    thumb = os.path.join(THUMB_DIR, f"{species_id}_{size[0]}x{size[1]}.png")
+    try:
+        if os.stat(thumb).st_mtime >= source_mtime:
+            with Image.open(thumb) as img:
+                return img.copy()
+    except OSError:
+        pass  # no thumbnail yet, or unreadable => rebuild it
+
+    with Image.open(source) as img:
+        img = img.resize(size, RESAMPLE)
+    try:
+        os.makedirs(THUMB_DIR, exist_ok=True)
+        tmp = thumb + "." + str(os.getpid()) + ".tmp"
+        img.save(tmp, format="PNG")
+        os.replace(tmp, thumb)
+    except OSError:
+        pass  # read-only checkout: just skip the disk cache
+    return img
+
+
+def has_sprite(species_id, size=THUMB_SIZE):
+    """
+    Whether a species has a sprite; answered from the atlas index, without a syscall, once one is built.
+    """
+    atlas = get_atlas()
+    if atlas is not None:
+        # The atlas is built from every sprite file, so its index is authoritative.
+        return species_id in atlas.species
+    return os.path.exists(sprite_path(species_id))
+
+
+class ThumbnailCache:
+    """
+    In-process LRU of ready PhotoImage objects keyed by (species ID, size).
+    Misses are decoded off the Tk thread by SpriteLoader, which hands the
+    images to put(). PhotoImages belong to one Tk root, so the cache is
+    emptied when a new root asks.
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self._photos = OrderedDict()
+        self._master = None
+
+    def cached(self, master, species_id, size=THUMB_SIZE):
+        """
+        Return the PhotoImage if it is already in memory, else None (never loads).
+        """
+        if master is not self._master:
+            self._photos.clear()
+            self._master = master
+        key = (species_id, size)
+        photo = self._photos.get(key)
+        if photo is not None:
+            self._photos.move_to_end(key)
+        return photo
+
+    def put(self, master, species_id, img, size=THUMB_SIZE):
+        """
+        Turn a decoded PIL image into a cached PhotoImage. Tk thread only.
+        """
+        if master is not self._master:
+            self._photos.clear()
+            self._master = master
+        photo = ImageTk.PhotoImage(img, master=master)
+        self._photos[(species_id, size)] = photo
+        if len(self._photos) > self.capacity:
+            self._photos.popitem(last=False)
+        return photo
+
+
+THUMBNAILS = ThumbnailCache()
+
+
+class SpriteLoader:
+    """
+    Decodes and resizes sprites on a thread pool, off the Tk main thread.
+    Finished images come back through a thread-safe queue that the Tk thread
+    drains every POLL_MS via after(); only there are they turned into
+    PhotoImages (Tk isn't thread-safe) and handed to 'on_ready'.
+    """
+
+    POLL_MS = 30
+
+    def __init__(self, root, on_ready, workers=4):
+        self.root = root
+        self.on_ready = on_ready
+        # Open the atlas here, on the Tk thread, before any worker can ask for it.
+        get_atlas()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sprites")
+        self.done = queue.Queue()
+        self.pending = set()
+        self.closed = False
+        root.after(self.POLL_MS, self.poll)
+
+    def request(self, species_id):
+        if species_id in self.pending or self.closed:
+            return
+        self.pending.add(species_id)
+        self.executor.submit(self._decode, species_id)
+
+    def _decode(self, species_id):
+        try:
+            self.done.put((species_id, load_thumbnail_image(species_id), None))
+        except Exception as e:
+            self.done.put((species_id, None, e))
+
+    def poll(self):
+        if self.closed:
+            return
+        while True:
+            try:
+                species_id, img, error = self.done.get_nowait()
+            except queue.Empty:
+                break
+            self.pending.discard(species_id)
+            if error is not None:
+                print(f"Error loading image {sprite_path(species_id)}: {error}")
+                # If error, we'll ignore and just not show the image
+            elif img is not None:
+                self.on_ready(species_id, THUMBNAILS.put(self.root, species_id, img))
+        self.root.after(self.POLL_MS, self.poll)
+
+    def close(self):
+        self.closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def make_placeholder(root, size=THUMB_SIZE):
+    """
+    A flat grey square shown until a row's sprite has been decoded.
+    """
+    placeholder = tk.PhotoImage(master=root, width=size[0], height=size[1])
+    placeholder.put("#d9d9d9", to=(0, 0, size[0], size[1]))
+    return placeholder
+
+
+# Rows are virtualized: the canvas scroll region is as tall as the whole list,
+# but only the rows in view (plus OVERSCAN above and below) have widgets. As
+# the view moves, row widgets that scrolled out are moved and re-filled with
+# the newly visible Pokemon instead of creating new ones.
+ROW_HEIGHT = THUMB_SIZE[1] + 30
+ROW_PADDING = 5
+OVERSCAN = 3
+
+
+def format_pokemon_info(poke):
+    """
+    The text shown in a Pokemon's row.
+    """
+    return (
+        f"ID: {poke['ID']} | "
+        f"Name: {poke['Name']} | "
+        f"Type: {poke['Type']} | "
+        f"HP: {poke['HP']} | "
+        f"Attack: {poke['Attack']} | "
+        f"Can Evolve: {poke['Can Evolve']}"
+    )
+
+
+class PokemonRow:
+    """
+    One reusable row widget: a framed text label with a sprite on the right.
+    """
+
+    def __init__(self, canvas):
+        self.frame = tk.Frame(canvas, bd=2, relief='groove', padx=5, pady=5)
+        self.frame.pack_propagate(False)
+        self.label = tk.Label(self.frame, anchor="w")
+        self.label.pack(side="left", fill="x", expand=True)
+        self.picLabel = tk.Label(self.frame)
+        self.picLabel.pack(side="right", padx=5)
+        self.window = canvas.create_window((ROW_PADDING * 2, 0), window=self.frame,
+                                           anchor="nw", height=ROW_HEIGHT - 2 * ROW_PADDING)
+        self.index = None
+        self.species_id = None
+
+    def show(self, root, index, poke, loader, placeholder):
+        """
+        Fill the row. Text appears right away; if the sprite isn't in memory
+        yet the placeholder is shown and the loader is asked to decode it.
+        """
+        self.index = index
+        self.species_id = poke['ID']
+        self.label.configure(text=format_pokemon_info(poke))
+        photo = THUMBNAILS.cached(root, poke['ID'])
+        if photo is None and has_sprite(poke['ID']):
+            photo = placeholder
+            loader.request(poke['ID'])
+        self.set_photo(photo)
+
+    def set_photo(self, photo):
+        self.picLabel.configure(image=photo if photo is not None else "")
+        self.picLabel.photo = photo  # keep reference
+
+
+class VirtualPokemonList:
+    """
+    Keeps just enough PokemonRow widgets for the visible part of the canvas.
+    """
+
+    def __init__(self, root, canvas, pokeList):
+        self.root = root
+        self.canvas = canvas
+        self.pokeList = pokeList
+        self.rows = []
+        self.width = 1
+        self.placeholder = make_placeholder(root)
+        self.loader = SpriteLoader(root, self.on_sprite_ready)
+        canvas.configure(scrollregion=(0, 0, 1, len(pokeList) * ROW_HEIGHT))
+
+    def set_width(self, width):
+        self.width = width
+        for row in self.rows:
+            self.canvas.itemconfig(row.window, width=max(1, width - 4 * ROW_PADDING))
+        self.canvas.configure(scrollregion=(0, 0, width, len(self.pokeList) * ROW_HEIGHT))
+
+    def refresh(self):
+        top = self.canvas.canvasy(0)
+        height = max(self.canvas.winfo_height(), ROW_HEIGHT)
+        first = max(0, int(top // ROW_HEIGHT) - OVERSCAN)
+        last = min(len(self.pokeList), int((top + height) // ROW_HEIGHT) + 1 + OVERSCAN)
+        wanted = range(first, last)
+
+        while len(self.rows) < len(wanted):
+            row = PokemonRow(self.canvas)
+            self.canvas.itemconfig(row.window, width=max(1, self.width - 4 * ROW_PADDING))
+            self.rows.append(row)
+
+        # Rows already showing a wanted index stay put; the rest are recycled.
+        showing = {row.index: row for row in self.rows if row.index in wanted}
+        spare = [row for row in self.rows if row.index not in showing or showing[row.index] is not row]
+        for index in wanted:
+            row = showing.get(index)
+            if row is None:
+                row = spare.pop()
+                row.show(self.root, index, self.pokeList[index], self.loader, self.placeholder)
+                self.canvas.coords(row.window, ROW_PADDING * 2, index * ROW_HEIGHT + ROW_PADDING)
+        for row in spare:
+            # Park unused rows above the scroll region, out of sight.
+            row.index = None
+            self.canvas.coords(row.window, ROW_PADDING * 2, -2 * ROW_HEIGHT)
+
+    def on_sprite_ready(self, species_id, photo):
+        for row in self.rows:
+            if row.index is not None and row.species_id == species_id:
+                row.set_photo(photo)
+
+
+def show_Pokedex_GUI(pokeList):
+    """
+    Display each Pokemon in a simple Tkinter window with its Name, Type, HP,
+    Attack, and optionally an image from the 'pokemons' folder.
+    We allow horizontal resizing so each Pokemon 'frame' expands in width.
+    Only the rows in view are built, so long lists open as fast as short ones.
+    """
+    root = tk.Tk()
+    root.title("My Pokedex GUI")
+    pokeList = list(pokeList)
+
+    # Create a canvas and a vertical scrollbar
+    canvas = tk.Canvas(root)
+    scrollbar = tk.Scrollbar(root, orient="vertical", command=canvas.yview)
+
+    # Pack the canvas and scrollbar
+    canvas.pack(side="left", fill="both", expand=True)
+    scrollbar.pack(side="right", fill="y")
+
+    if not pokeList:
+        # A canvas item, not packed: packing into the canvas would shrink it to the label.
+        msg = tk.Label(canvas, text="No Pokemon in this Pokedex!")
+        canvas.create_window((ROW_PADDING * 2, ROW_PADDING * 2), window=msg, anchor="nw")
+        root.mainloop()
+        return
+
+    rows = VirtualPokemonList(root, canvas, pokeList)
+
+    # Every scroll (scrollbar, wheel or resize) goes through yscrollcommand,
+    # so that is where the visible rows get refreshed.
+    def on_scroll(first, last):
+        scrollbar.set(first, last)
+        rows.refresh()
+
+    canvas.configure(yscrollcommand=on_scroll)
+
+    # A callback to keep the rows the same width as the canvas
+    def on_canvas_configure(event):
+        rows.set_width(event.width)
+        rows.refresh()
+
+    canvas.bind("<Configure>", on_canvas_configure)
+
+    # Mouse wheel handling
+    def on_mouse_wheel(event):
+        # On Windows/macOS: event.delta is typically ±120 per wheel step
+        canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+
+    canvas.bind_all("<MouseWheel>", on_mouse_wheel)  # Windows/macOS
+    # For Linux (buttons 4=up, 5=down):
+    canvas.bind_all("<Button-4>", lambda e: canvas.yview_scroll(-1, "units"))
+    canvas.bind_all("<Button-5>", lambda e: canvas.yview_scroll(1, "units"))
+
+    canvas.configure(yscrollincrement=ROW_HEIGHT // 4)
+    rows.refresh()
+    try:
+        root.mainloop()
+    finally:
+        rows.loader.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Pokedex GUI tools")
+    parser.add_argument("command", choices=["build-atlas"])
+    parser.add_argument("--size", type=int, action="append",
+                        help="tile edge in pixels; repeat for several sizes (default: 80)")
+    args = parser.parse_args()
+    sizes = [(edge, edge) for edge in args.size] if args.size else [THUMB_SIZE]
+    count = build_sprite_atlas(ATLAS_PATH, sizes)
+    print(f"Packed {count} tiles into {ATLAS_PATH}")
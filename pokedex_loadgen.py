@@ -0,0 +1,98 @@
+# pokedex_loadgen.py
+
+import argparse
+import asyncio
+import random
+import time
+
+# Load generator for pokedex_server.py. Opens N connections, each sending one
+# request at a time (closed loop), and reports throughput and latency
+# percentiles. Owners are created first so the reads have something to find.
+
+READ_TEMPLATES = ["show {owner}", "rank {owner}", "top 10", "filter type=water hp>60"]
+WRITE_TEMPLATES = ["add {poke} {owner}", "release {poke} {owner}", "evolve {poke} {owner}"]
+
+
+async def request(reader, writer, line):
+    """
+    Send one command and read its response up to the terminating ".". Return the response lines.
+    """
+    writer.write((line + "\n").encode("utf-8"))
+    await writer.drain()
+    lines = []
+    while True:
+        raw = await reader.readline()
+        if not raw:
+            raise ConnectionError("server closed the connection")
+        text = raw.decode("utf-8").rstrip("\n")
+        if text == ".":
+            return lines
+        lines.append(text[1:] if text.startswith("..") else text)
+
+
+async def connect(args):
+    if args.unix:
+        return await asyncio.open_unix_connection(args.unix)
+    return await asyncio.open_connection(args.host, args.port)
+
+
+async def client(args, client_id, latencies, rng):
+    reader, writer = await connect(args)
+    try:
+        for _ in range(args.requests):
+            owner = "load-" + str(rng.randrange(args.owners))
+            if rng.random() < args.read_ratio:
+                template = rng.choice(READ_TEMPLATES)
+            else:
+                template = rng.choice(WRITE_TEMPLATES)
+            line = template.format(owner=owner, poke=rng.randint(1, 135))
+            start = time.perf_counter()
+            await request(reader, writer, line)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def run(args):
+    reader, writer = await connect(args)
+    for i in range(args.owners):
+        await request(reader, writer, "create " + str(1 + 3 * (i % 3)) + " load-" + str(i))
+    writer.close()
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args, i, latencies, random.Random(args.seed + i))
+                           for i in range(args.connections)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(str(len(latencies)) + " requests over " + str(args.connections) + " connections in "
+          + format(elapsed, ".2f") + "s: " + format(len(latencies) / elapsed, ",.0f") + " req/s")
+    for label, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99), ("p99.9", 0.999)):
+        print("  " + label + ": " + format(percentile(latencies, fraction) * 1000, ".2f") + " ms")
+    print("  max: " + format(latencies[-1] * 1000 if latencies else 0.0, ".2f") + " ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for pokedex_server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", help="connect to a Unix socket instead of TCP")
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per connection")
+    parser.add_argument("--owners", type=int, default=1000, help="owners to create before the run")
+    parser.add_argument("--read-ratio", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# pokedex_server.py
+
+import argparse
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import ex7
+
+# Requests are ex7 batch commands, one per line (see the Batch Mode section in
+# ex7.py). Each response is the command's output lines followed by a line
+# holding a single "."; output lines that start with "." get an extra "."
+# in front, and a malformed command answers "ERR <reason>" before the ".".
+#
+# Commands run on a thread pool so a long read (printing a big tree) never
+# stalls the event loop. Reads share the store; writes get it exclusively.
+# Commands that touch files on the server host are refused: any client that
+# can reach the socket could otherwise read or write wherever the server
+# user can. Likewise the server, not the client, decides how many processes
+# "analytics" forks: any worker count the client sends is dropped.
+
+READ_COMMANDS = {"show", "owners", "species", "sort", "top", "bottom", "rank", "print", "filter", "analytics", "stats",
+                 "holders", "holding"}
+LOCAL_ONLY_COMMANDS = {"import", "export"}
+
+
+class RWLock:
+    """
+    asyncio reader-writer lock. Any number of readers may hold it together;
+    a writer waits for them to drain and holds it alone. Once a writer is
+    waiting, new readers queue behind it, so steady read traffic can't
+    starve writes.
+    """
+
+    def __init__(self):
+        self._cond = asyncio.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    async def acquire_read(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: not self._writer and not self._writers_waiting)
+            self._readers += 1
+
+    async def release_read(self):
+        async with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    async def acquire_write(self):
+        async with self._cond:
+            self._writers_waiting += 1
+            try:
+                await self._cond.wait_for(lambda: not self._writer and self._readers == 0)
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+
+    async def release_write(self):
+        async with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+def execute(line):
+    """
+    Run one command and materialize its output (reports are generators, and
+    must be consumed while the lock is still held).
+    """
+    try:
+        return list(ex7.run_batch_command(line)), None
+    except ValueError as e:
+        return None, str(e)
+    except Exception as e:
+        # Anything else (an OSError, a failed worker, ...) still gets an ERR
+        # reply, so the client isn't left waiting and the connection stays up.
+        return None, type(e).__name__ + ": " + str(e)
+
+
+class PokedexServer:
+    """
+    Serves the ex7 owner store to any number of concurrent clients.
+    """
+
+    def __init__(self, workers):
+        self.lock = RWLock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pokedex")
+
+    async def run_command(self, line):
+        loop = asyncio.get_running_loop()
+        command = line.split(None, 1)[0].lower()
+        if command in LOCAL_ONLY_COMMANDS:
+            return None, "'" + command + "' is not available over the server"
+        if command == "analytics":
+            line = command
+        is_read = command in READ_COMMANDS
+        if is_read:
+            await self.lock.acquire_read()
+        else:
+            await self.lock.acquire_write()
+        try:
+            return await loop.run_in_executor(self.executor, execute, line)
+        finally:
+            if is_read:
+                await self.lock.release_read()
+            else:
+                await self.lock.release_write()
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                line = raw.decode("utf-8", "replace").strip()
+                if not line:
+                    continue
+                if line.lower() == "quit":
+                    break
+                lines, error = await self.run_command(line)
+                out = []
+                if error is not None:
+                    out.append("ERR " + error)
+                else:
+                    for result in lines:
+                        # A message may hold several lines (e.g. evolve + release).
+                        for part in result.split("\n"):
+                            out.append("." + part if part.startswith(".") else part)
+                out.append(".")
+                writer.write(("\n".join(out) + "\n").encode("utf-8"))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+async def serve(args):
+    server = PokedexServer(args.workers)
+    if args.unix:
+        listener = await asyncio.start_unix_server(server.handle_client, path=args.unix)
+        where = args.unix
+    else:
+        listener = await asyncio.start_server(server.handle_client, args.host, args.port)
+        where = args.host + ":" + str(args.port)
+    print("Serving the Pokedex on " + where)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Hoenn Pokedex owner store over a local socket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4,
+                        help="threads running commands (default: CPU count)")
+    parser.add_argument("--stats", action="store_true", help="collect call counts and latencies (also POKEDEX_STATS=1)")
+    parser.add_argument("--snapshot", help="load owners from this file on start and save them on exit")
+    parser.add_argument("--journal", help="also log every change to this file (needs --snapshot)")
+    args = parser.parse_args()
+    if args.journal and not args.snapshot:
+        parser.error("--journal needs --snapshot")
+    if args.stats or os.environ.get("POKEDEX_STATS", "") not in ("", "0"):
+        ex7.enable_instrumentation()
+
+    if args.snapshot is not None:
+        ex7.open_owner_store(args.snapshot, args.journal)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.snapshot is not None:
+            ex7.close_owner_store(args.snapshot)
+
+
+if __name__ == "__main__":
+    main()
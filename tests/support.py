@@ -0,0 +1,54 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import ex7  # noqa: E402
+
+
+def crash():
+    """
+    Simulate a crash: make pending records durable, stop the journal thread
+    and drop the store without compacting it into the snapshot.
+    """
+    journal = ex7.ownerJournal
+    journal._stop.set()
+    journal._thread.join()
+    journal.flush()
+    journal.f.close()
+    ex7.ownerJournal = None
+    ex7.ownerRoot = None
+
+
+class StoreTestCase(unittest.TestCase):
+    """
+    Gives each test a scratch directory for a snapshot and journal, and puts
+    the module-level store back to empty afterwards.
+    """
+
+    def setUp(self):
+        self.catalog_csv = ex7.CATALOG_CSV
+        ex7.CATALOG_CSV = os.path.join(REPO, "hoenn_pokedex.csv")
+        self.dir = tempfile.mkdtemp()
+        self.snapshot = os.path.join(self.dir, "owners.snap")
+        self.journal = os.path.join(self.dir, "owners.journal")
+
+    def tearDown(self):
+        if ex7.ownerJournal is not None:
+            crash()
+        # Dropping every reference to a loaded tree also releases the
+        # snapshot's mmap before its directory goes.
+        ex7.ownerRoot = None
+        ex7.ownerCount = 0
+        ex7.ownerRanking = None
+        ex7.ownerHolders = None
+        ex7.ownerStoreLoaded = None
+        ex7.CATALOG_CSV = self.catalog_csv
+        shutil.rmtree(self.dir)
+
+    def owners(self):
+        return [node["owner"] for node in ex7.iter_in_order(ex7.ownerRoot)]
@@ -0,0 +1,71 @@
+import random
+import unittest
+from unittest import mock
+
+from support import StoreTestCase, ex7
+
+
+class AnalyticsTest(StoreTestCase):
+
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(7)
+        species = ex7.get_catalog().size - 1
+        self.root = None
+        for i in rng.sample(range(2000), 2000):
+            node = ex7.new_owner_node("owner" + format(i, "04d"), rng.sample(range(1, species + 1), rng.randint(1, 20)))
+            self.root = ex7.insert_owner_bst(self.root, node)
+        self.height = ex7.ANALYTICS_PARALLEL_HEIGHT
+
+    def tearDown(self):
+        ex7.ANALYTICS_PARALLEL_HEIGHT = self.height
+        super().tearDown()
+
+    def test_key_ranges_cover_every_owner_once(self):
+        paths, top = ex7.analytics_split(self.root, 16)
+        self.assertGreaterEqual(len(paths), 16)
+        owners = [node["owner"] for node in top]
+        for path in paths:
+            owners += [node["owner"] for node in ex7.iter_pre_order(self.subtree(path))]
+        self.assertEqual(sorted(owners), [node["owner"] for node in ex7.iter_in_order(self.root)])
+
+    def subtree(self, path):
+        node = self.root
+        for step in path:
+            node = node["left"] if step == "L" else node["right"]
+        return node
+
+    def test_pool_matches_serial(self):
+        ex7.ANALYTICS_PARALLEL_HEIGHT = 1
+        serial = ex7.owner_analytics(self.root, 1)
+        self.assertEqual(serial["owners"], 2000)
+        with mock.patch("os.cpu_count", return_value=3):
+            self.assertEqual(ex7.owner_analytics(self.root, 3), serial)
+        self.assertIsNone(ex7.analyticsRoot)
+
+    def test_workers_are_capped(self):
+        ex7.ANALYTICS_PARALLEL_HEIGHT = 1
+        with mock.patch("os.cpu_count", return_value=2):
+            self.assertEqual(ex7.analytics_workers(self.root, 64), 2)
+            self.assertEqual(ex7.analytics_workers(self.root, None), 2)
+        with mock.patch("os.cpu_count", return_value=1):
+            self.assertEqual(ex7.analytics_workers(self.root, 64), 1)
+        pools = []
+        real_pool = ex7.concurrent.futures.ProcessPoolExecutor
+
+        def pool(max_workers, **kwargs):
+            pools.append(max_workers)
+            return real_pool(max_workers, **kwargs)
+
+        small = None
+        for name in ("a", "b", "c"):
+            small = ex7.insert_owner_bst(small, ex7.new_owner_node(name, [1]))
+        with mock.patch("os.cpu_count", return_value=4), \
+                mock.patch.object(ex7.concurrent.futures, "ProcessPoolExecutor", pool):
+            # Fewer nodes than ranges: nothing is left for a pool to do.
+            self.assertEqual(ex7.owner_analytics(small, 64)["owners"], 3)
+            self.assertEqual(ex7.owner_analytics(self.root, 64)["owners"], 2000)
+        self.assertEqual(pools, [4])
+
+if __name__ == "__main__":
+    unittest.main()
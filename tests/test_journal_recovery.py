@@ -0,0 +1,139 @@
+import os
+import threading
+import unittest
+from unittest import mock
+
+from support import StoreTestCase, crash, ex7
+
+
+class JournalRecoveryTest(StoreTestCase):
+
+    def test_records_after_a_torn_tail_survive_the_next_crash(self):
+        ex7.open_owner_store(self.snapshot, self.journal)
+        ex7.create_owner("Ash", 1)
+        ex7.create_owner("Misty", 7)
+        crash()
+        with open(self.journal, "ab") as f:
+            f.write(b"\x03\x00")
+
+        ex7.open_owner_store(self.snapshot, self.journal)
+        self.assertEqual(self.owners(), ["Ash", "Misty"])
+        ex7.create_owner("Brock", 4)
+        crash()
+
+        ex7.open_owner_store(self.snapshot, self.journal)
+        self.assertEqual(self.owners(), ["Ash", "Brock", "Misty"])
+
+    def test_corrupt_record_is_cut_off(self):
+        ex7.open_owner_store(self.snapshot, self.journal)
+        ex7.create_owner("Ash", 1)
+        crash()
+        good_size = os.path.getsize(self.journal)
+        with open(self.journal, "ab") as f:
+            f.write(ex7.JOURNAL_RECORD.pack(ex7.JOURNAL_CREATE, 4, 5, 0) + b"Brock")
+
+        ex7.open_owner_store(self.snapshot, self.journal)
+        self.assertEqual(os.path.getsize(self.journal), good_size)
+        ex7.create_owner("Misty", 7)
+        crash()
+
+        ex7.open_owner_store(self.snapshot, self.journal)
+        self.assertEqual(self.owners(), ["Ash", "Misty"])
+
+    def test_torn_header_starts_a_fresh_journal(self):
+        with open(self.journal, "wb") as f:
+            f.write(ex7.JOURNAL_MAGIC[:2])
+
+        ex7.open_owner_store(self.snapshot, self.journal)
+        ex7.create_owner("Ash", 1)
+        crash()
+
+        ex7.open_owner_store(self.snapshot, self.journal)
+        self.assertEqual(self.owners(), ["Ash"])
+
+    def test_writers_run_during_compaction_and_are_kept(self):
+        ex7.open_owner_store(self.snapshot, self.journal)
+        ex7.create_owner("Ash", 1)
+        real_save = ex7.save_owner_snapshot
+        writer = threading.Thread(target=ex7.create_owner, args=("Brock", 4))
+
+        def save_while_writing(root, filename, journal_seq=0):
+            # The save runs outside STORE_LOCK, so this write must not block.
+            writer.start()
+            writer.join(5)
+            self.assertFalse(writer.is_alive())
+            real_save(root, filename, journal_seq)
+
+        ex7.save_owner_snapshot = save_while_writing
+        try:
+            ex7.ownerJournal.compact()
+        finally:
+            ex7.save_owner_snapshot = real_save
+        self.assertEqual([n["owner"] for n in ex7.iter_in_order(ex7.load_owner_snapshot(self.snapshot))], ["Ash"])
+        crash()
+
+        ex7.open_owner_store(self.snapshot, self.journal)
+        self.assertEqual(self.owners(), ["Ash", "Brock"])
+
+    def test_import_compacts_without_holding_the_store_lock(self):
+        # compact() takes compact_lock then STORE_LOCK, as the journal thread
+        # does; entering it with STORE_LOCK held would invert that order.
+        ex7.open_owner_store(self.snapshot, self.journal)
+        source = os.path.join(self.dir, "owners.csv")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write("owner,pokemon\nAsh,1 4\nMisty,7\n")
+        real_compact = ex7.ownerJournal.compact
+        held = []
+
+        def compact():
+            held.append(ex7.STORE_LOCK._is_owned())
+            real_compact()
+
+        ex7.ownerJournal.compact = compact
+        ex7.import_owners(source)
+        self.assertEqual(held, [False])
+        crash()
+
+        ex7.open_owner_store(self.snapshot, self.journal)
+        self.assertEqual(self.owners(), ["Ash", "Misty"])
+
+    def test_restore_compacts_without_holding_the_store_lock(self):
+        ex7.open_owner_store(self.snapshot, self.journal)
+        ex7.create_owner("Ash", 1)
+        before = ex7.snapshot_owners()
+        ex7.create_owner("Brock", 4)
+        real_compact = ex7.ownerJournal.compact
+        held = []
+
+        def compact():
+            held.append(ex7.STORE_LOCK._is_owned())
+            real_compact()
+
+        ex7.ownerJournal.compact = compact
+        ex7.restore_owners(before)
+        self.assertEqual(held, [False])
+        crash()
+
+        ex7.open_owner_store(self.snapshot, self.journal)
+        self.assertEqual(self.owners(), ["Ash"])
+
+    def test_closing_an_untouched_store_does_not_rewrite_it(self):
+        ex7.open_owner_store(self.snapshot, self.journal)
+        ex7.create_owner("Ash", 1)
+        ex7.close_owner_store(self.snapshot)
+        for journal in (self.journal, None):
+            ex7.open_owner_store(self.snapshot, journal)
+            with mock.patch.object(ex7, "save_owner_snapshot") as save:
+                ex7.close_owner_store(self.snapshot)
+            save.assert_not_called()
+
+        ex7.open_owner_store(self.snapshot, self.journal)
+        ex7.create_owner("Misty", 7)
+        ex7.close_owner_store(self.snapshot)
+        ex7.open_owner_store(self.snapshot)
+        self.assertEqual(self.owners(), ["Ash", "Misty"])
+        ex7.close_owner_store(self.snapshot)
+
+
+if __name__ == "__main__":
+    unittest.main()
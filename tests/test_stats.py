@@ -0,0 +1,43 @@
+import unittest
+
+from support import StoreTestCase, crash, ex7
+
+
+class StatsSnapshotTest(StoreTestCase):
+
+    def tearDown(self):
+        ex7.disable_instrumentation()
+        super().tearDown()
+
+    def test_stats_reads_no_index_and_no_nodes(self):
+        ex7.open_owner_store(self.snapshot)
+        for i in range(50):
+            ex7.create_owner("owner" + str(i), 1)
+        ex7.delete_owner("owner7")
+        ex7.close_owner_store(self.snapshot)
+
+        ex7.open_owner_store(self.snapshot)
+        ex7.enable_instrumentation()
+        stats = ex7.stats_snapshot()
+        self.assertEqual(stats["tree"]["size"], 49)
+        self.assertEqual(stats["tree"]["height"], ex7.ownerRoot["height"])
+        self.assertIsNone(ex7.ownerRanking)
+        self.assertEqual(stats["ops"]["iter_pre_order"]["calls"], 0)
+        # Only the root has been decoded from the snapshot.
+        self.assertNotIn("left", ex7.ownerRoot)
+
+    def test_count_follows_journal_replay(self):
+        ex7.open_owner_store(self.snapshot, self.journal)
+        ex7.create_owner("Ash", 1)
+        ex7.create_owner("Misty", 7)
+        ex7.create_owner("Ash", 4)
+        ex7.delete_owner("Misty")
+        ex7.create_owner("Brock", 4)
+        crash()
+
+        ex7.open_owner_store(self.snapshot, self.journal)
+        self.assertEqual(ex7.stats_snapshot()["tree"]["size"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()